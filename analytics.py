@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Offline history analytics for Monkey-CLI (`monkey_cli.py stats`).
+
+The storage backend hands over the history as one list per field (no
+per-result dicts), which is turned into typed columns once and then
+summarized: percentile bands, rolling averages, per-dictionary,
+per-duration and per-mode breakdowns, and linear trends. Vectorized with
+NumPy when it is installed; otherwise with `array`, `itertools` and
+`operator` maps that keep the per-result loops in C.
+"""
+
+import csv
+import io
+import json
+import math
+from array import array
+from datetime import datetime
+from itertools import accumulate, compress, repeat
+from operator import eq, getitem, mul, sub, truediv
+from typing import Dict, List, Optional
+
+from options import TABLES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Up to this many distinct keys, a breakdown takes one C-level pass per key
+# instead of one Python-level pass over all results
+_FEW_GROUPS = 64
+
+
+def _epoch(timestamp) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class Columns:
+    """History as parallel typed arrays, one entry per result."""
+
+    def __init__(self, columns: Dict[str, list]):
+        """
+        Args:
+            columns: One list per field, oldest first, as returned by a
+                storage backend's summary_columns()
+        """
+        stamps = columns["timestamp"]
+        keep = None
+        try:
+            # Every timestamp parsed once, in C
+            self.timestamp = array("d", map(datetime.timestamp,
+                                            map(datetime.fromisoformat, stamps)))
+        except (TypeError, ValueError):
+            # Leave out results whose timestamp cannot be read
+            epochs = list(map(_epoch, stamps))
+            keep = [i for i, t in enumerate(epochs) if t is not None]
+            self.timestamp = array("d", (epochs[i] for i in keep))
+
+        def field(name):
+            values = columns[name]
+            return values if keep is None else [values[i] for i in keep]
+
+        self.wpm = array("d", field("wpm"))
+        self.accuracy = array("d", field("accuracy"))
+        self.duration = array("l", [v or 0 for v in field("duration")])
+        self.chars = array("l", [v or 0 for v in field("total_chars")])
+        self.dictionary: List[Optional[str]] = field("dictionary")
+        self.mode: List[Optional[str]] = field("mode")
+
+    def __len__(self) -> int:
+        return len(self.wpm)
+
+
+def _rank(p: float, n: int) -> int:
+    """
+    Index of the p-th percentile in n sorted values: the nearest rank to
+    linear interpolation's position, so the same history gives the same
+    bands with or without NumPy.
+    """
+    return min(n - 1, int(p / 100 * (n - 1) + 0.5))
+
+
+def _describe(values) -> Dict:
+    """Count, mean, stddev, min/max and percentile bands of one column."""
+    n = len(values)
+    if n == 0:
+        return {"count": 0}
+    if np is not None:
+        v = np.frombuffer(values, dtype=np.float64)
+        ordered = np.sort(v)
+        bands = ordered[[_rank(p, n) for p in PERCENTILES]]
+        mean, std, lo, hi = v.mean(), (v.std(ddof=1) if n > 1 else 0.0), v.min(), v.max()
+    else:
+        ordered = sorted(values)
+        bands = [ordered[_rank(p, n)] for p in PERCENTILES]
+        mean = math.fsum(values) / n
+        deviations = list(map(sub, values, repeat(mean)))
+        std = math.sqrt(math.fsum(map(mul, deviations, deviations)) / (n - 1)) if n > 1 else 0.0
+        lo, hi = ordered[0], ordered[-1]
+    out = {"count": n, "mean": round(float(mean), 2), "stddev": round(float(std), 2),
+           "min": round(float(lo), 2), "max": round(float(hi), 2)}
+    for p, b in zip(PERCENTILES, bands):
+        out[f"p{p}"] = round(float(b), 2)
+    return out
+
+
+def _rolling(values, window: int) -> List[Dict]:
+    """Trailing mean and p10/p90 band over `window` results."""
+    n = len(values)
+    if n == 0:
+        return []
+    if np is not None:
+        v = np.frombuffer(values, dtype=np.float64)
+        csum = np.concatenate(([0.0], np.cumsum(v)))
+        idx = np.arange(n)
+        start = np.maximum(0, idx - window + 1)
+        means = (csum[idx + 1] - csum[start]) / (idx + 1 - start)
+        if n >= window:
+            windows = np.sort(np.lib.stride_tricks.sliding_window_view(v, window), axis=1)
+            lo = np.concatenate((np.full(window - 1, np.nan), windows[:, _rank(10, window)]))
+            hi = np.concatenate((np.full(window - 1, np.nan), windows[:, _rank(90, window)]))
+        else:
+            lo, hi = np.full(n, np.nan), np.full(n, np.nan)
+        for i in range(min(window - 1, n)):
+            head = np.sort(v[:i + 1])
+            lo[i], hi[i] = head[_rank(10, i + 1)], head[_rank(90, i + 1)]
+        rows = zip(means.tolist(), lo.tolist(), hi.tolist())
+        means, lo, hi = means.tolist(), lo.tolist(), hi.tolist()
+    else:
+        # Same arithmetic as above, one C-level map per step
+        csum = list(accumulate(values, initial=0.0))
+        head = range(1, min(window - 1, n) + 1)  # sizes of the windows still filling up
+        full = max(0, n - window + 1)
+        starts = [0] * len(head) + list(range(full))
+        sizes = list(head) + [window] * full
+        means = list(map(truediv, map(sub, csum[1:], map(csum.__getitem__, starts)), sizes))
+        ordered = list(map(sorted, map(values.__getitem__, map(slice, starts, range(1, n + 1)))))
+        lo = list(map(getitem, ordered, [_rank(10, k) for k in head] + [_rank(10, window)] * full))
+        hi = list(map(getitem, ordered, [_rank(90, k) for k in head] + [_rank(90, window)] * full))
+    return [{"index": i, "mean": m, "p10": l, "p90": h}
+            for i, m, l, h in zip(range(n), map(round, means, repeat(2)),
+                                  map(round, lo, repeat(2)), map(round, hi, repeat(2)))]
+
+
+def _group(columns: Columns, keys: List) -> List[Dict]:
+    """Per-key count, mean/best WPM and mean accuracy."""
+    groups: Dict = {}
+    distinct = set(keys)
+    if len(distinct) <= _FEW_GROUPS:
+        for key in distinct:
+            wpm = list(compress(columns.wpm, map(eq, keys, repeat(key))))
+            accuracy = math.fsum(compress(columns.accuracy, map(eq, keys, repeat(key))))
+            groups[key] = [len(wpm), math.fsum(wpm), max(wpm), accuracy]
+    else:
+        for i, key in enumerate(keys):
+            g = groups.get(key)
+            if g is None:
+                g = groups[key] = [0, 0.0, 0.0, 0.0]
+            wpm = columns.wpm[i]
+            g[0] += 1
+            g[1] += wpm
+            g[2] = max(g[2], wpm)
+            g[3] += columns.accuracy[i]
+    return [{"key": k, "count": c, "average_wpm": round(s / c, 2), "best_wpm": round(b, 2),
+             "average_accuracy": round(a / c, 2)}
+            for k, (c, s, b, a) in sorted(groups.items(), key=lambda kv: str(kv[0]))]
+
+
+def _linregress(x, y) -> Dict:
+    """Least-squares slope, intercept and r^2 of y against x."""
+    n = len(x)
+    if n < 2:
+        return {"slope": 0.0, "intercept": float(y[0]) if n else 0.0, "r2": 0.0}
+    if np is not None:
+        xv = np.asarray(x, dtype=np.float64)
+        yv = np.asarray(y, dtype=np.float64)
+        mx, my = xv.mean(), yv.mean()
+        sxx = float(((xv - mx) ** 2).sum())
+        sxy = float(((xv - mx) * (yv - my)).sum())
+        syy = float(((yv - my) ** 2).sum())
+    else:
+        mx, my = math.fsum(x) / n, math.fsum(y) / n
+        dx, dy = list(map(sub, x, repeat(mx))), list(map(sub, y, repeat(my)))
+        sxx = math.fsum(map(mul, dx, dx))
+        sxy = math.fsum(map(mul, dx, dy))
+        syy = math.fsum(map(mul, dy, dy))
+    slope = sxy / sxx if sxx else 0.0
+    r2 = (sxy * sxy) / (sxx * syy) if sxx and syy else 0.0
+    return {"slope": round(slope, 4), "intercept": round(float(my - slope * mx), 2),
+            "r2": round(r2, 4)}
+
+
+def analyze(columns: Dict[str, list], window: int = 10) -> Dict:
+    """
+    Compute every report table from the stored history.
+
+    Args:
+        columns: Stored results as one list per field, oldest first
+            (a storage backend's summary_columns())
+        window: Number of results in each rolling window
+
+    Returns:
+        Dict keyed by table name (see TABLES)
+    """
+    c = Columns(columns)
+    first = c.timestamp[0] if len(c) else 0.0
+    days = array("d", map(truediv, map(sub, c.timestamp, repeat(first)), repeat(86400)))
+    index = array("d", range(len(c)))
+    return {
+        "summary": [dict(metric="wpm", **_describe(c.wpm)),
+                    dict(metric="accuracy", **_describe(c.accuracy))],
+        "rolling": _rolling(c.wpm, window),
+        "dictionary": _group(c, c.dictionary),
+        "duration": _group(c, list(c.duration)),
+        "mode": _group(c, c.mode),
+        "trend": [dict(metric="wpm_per_day", **_linregress(days, c.wpm)),
+                  dict(metric="wpm_per_test", **_linregress(index, c.wpm)),
+                  dict(metric="accuracy_per_test", **_linregress(index, c.accuracy))],
+    }
+
+
+def render(report: Dict, fmt: str = "json", table: Optional[str] = None) -> str:
+    """
+    Format a report as JSON (all tables, or one) or as CSV (one table).
+    """
+    if fmt == "json":
+        # No indent: lets json use its C encoder on long rolling tables
+        return json.dumps(report if table is None else report[table])
+    rows = report[table or "summary"]
+    out = io.StringIO()
+    if rows:
+        fields = list(dict.fromkeys(k for row in rows for k in row))
+        writer = csv.DictWriter(out, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    return out.getvalue()
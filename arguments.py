@@ -1,6 +1,8 @@
 import argparse
 import sys
 
+from options import BACKENDS, FSYNC_POLICIES, PROFILE_NAME, SAMPLING_MODES, TABLES
+
 parser = argparse.ArgumentParser(
                     prog='monkey-cli',
                     description='De-vibecoded terminal clone of slop that was inspired by MonkeyType.')
@@ -9,7 +11,44 @@ parser = argparse.ArgumentParser(
 parser.add_argument("-d","--duration",help="test time in seconds.",type=int,default=30)
 parser.add_argument("-w","--word-count",help="amount of words.",type=int,default=50)
 parser.add_argument("-H","--history",help="display history.",action="store_true")
+parser.add_argument("--heatmap",help="display per-key error heatmap.",action="store_true")
 parser.add_argument("-l","--list",help="dictionary list to use",type=str,default="default")
+parser.add_argument("--passage",help="type whole sentences of this plain-text file (a book, a log dump, ...) instead of random words; -w sets the least number of words.",type=str,default=None,metavar="FILE")
+parser.add_argument("-e","--endless",help="time-only test over endless text (ignores -w).",action="store_true")
+parser.add_argument("-s","--sampling",help="how words are drawn: uniformly, by word frequency, or as natural text learned from --corpus.",choices=SAMPLING_MODES,default="uniform")
+parser.add_argument("--drill",help="keys to practice; favours words containing them. 'auto' picks your weakest keys from the heatmap.",type=str,default=None)
+parser.add_argument("--min-length",help="shortest word to use.",type=int,default=None)
+parser.add_argument("--max-length",help="longest word to use.",type=int,default=None)
+parser.add_argument("--contains",help="only use words containing at least one of these letters.",type=str,default=None)
+parser.add_argument("--only",help="only use words made entirely of these letters.",type=str,default=None)
+parser.add_argument("--no-punctuation",help="skip words with anything but letters.",action="store_true")
+parser.add_argument("-g","--ghost",help="race a ghost of your best stored run with the same dictionary, mode and duration.",action="store_true")
+parser.add_argument("--seed",help="seed for word generation; the same seed and options give the same sequence of texts.",type=int,default=None)
+parser.add_argument("--corpus",help="plain-text file to learn word pairs from (-s natural).",type=str,default=None)
+parser.add_argument("--storage",help="history storage backend.",choices=BACKENDS,default="jsonl")
+parser.add_argument("--profile",help="keep a separate history under this name (in ~/.monkey-cli/profiles/).",type=str,default=None,metavar="NAME")
+parser.add_argument("--fsync",help="when saved results are forced to disk: never, after every write, or every few seconds.",choices=FSYNC_POLICIES,default="batch")
+parser.add_argument("--startup-report",help="print startup milestones and slowest imports on exit.",action="store_true")
+parser.add_argument("--instrument",help="time drawing, terminal output and input handling and show p50/p95 on screen.",action="store_true")
+parser.add_argument("--instrument-json",help="collect the same timings and write their histograms to this file on exit.",type=str,default=None,metavar="FILE")
+
+commands = parser.add_subparsers(dest="command")
+stats_parser = commands.add_parser("stats",help="print history analytics without starting the UI.")
+stats_parser.add_argument("-f","--format",help="output format.",choices=("json","csv"),default="json")
+stats_parser.add_argument("-t","--table",help="report table (csv defaults to summary, json to all).",choices=TABLES,default=None)
+stats_parser.add_argument("--window",help="results per rolling window.",type=int,default=10)
+stats_parser.add_argument("-o","--output",help="write to this file instead of stdout.",type=str,default=None)
+race_parser = commands.add_parser("race",help="race other players on this machine over a Unix socket.")
+race_parser.add_argument("--serve",help="host a race instead of joining one; the text comes from -w, -l, -s, --drill, --corpus and --passage.",action="store_true")
+race_parser.add_argument("-p","--players",help="racers to wait for before the start (--serve).",type=int,default=2)
+race_parser.add_argument("--countdown",help="seconds from the last join to the start (--serve).",type=float,default=3.0)
+race_parser.add_argument("--socket",help="socket path of the race (default: per-user path in the temp directory).",type=str,default=None)
+race_parser.add_argument("-n","--name",help="name shown to the other racers (default: your user name).",type=str,default=None)
+export_parser = commands.add_parser("export",help="write the history to a compact archive for moving it elsewhere.")
+export_parser.add_argument("file",help="archive to write ('-' for stdout).")
+export_parser.add_argument("--no-keystrokes",help="leave out keystroke timelines (most of the size).",action="store_true")
+import_parser = commands.add_parser("import",help="add the results of an archive to the history, skipping ones already there.")
+import_parser.add_argument("file",help="archive to read ('-' for stdin).")
 
 def get_arguments():
     try:
@@ -19,7 +58,23 @@ def get_arguments():
         if wc <= 0 or d <= 0:
             print("oh, dude! come on! No ZeroShitException in this app!")
             sys.exit(-1)
+        if (args.min_length is not None and args.min_length <= 0) or \
+                (args.max_length is not None and args.max_length <= 0):
+            print("oh, dude! come on! No ZeroShitException in this app!")
+            sys.exit(-1)
+        if args.min_length and args.max_length and args.min_length > args.max_length:
+            print("--min-length is longer than --max-length.")
+            sys.exit(-1)
+        if args.command == "race" and args.players <= 0:
+            print("a race needs at least one player.")
+            sys.exit(-1)
+        if args.sampling == "natural" and not args.corpus:
+            print("-s natural needs a --corpus to learn word pairs from.")
+            sys.exit(-1)
+        if args.profile is not None and not PROFILE_NAME.fullmatch(args.profile):
+            print("profile names are letters, digits, '_', '-' and '.', not starting with '.'.")
+            sys.exit(-1)
             
-        return d, wc,args.history, args.list
+        return args
     except SystemExit:
         sys.exit(0)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for Monkey-CLI.
+Runs headless replays against every dictionary in dicts/ and reports
+startup time, per-keystroke latency, frame rate and bytes per frame.
+Exits non-zero when a threshold is exceeded, for use in CI.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from headless import keys_for_text, run_headless
+from session_cache import SessionCache
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def bench_dictionary(name: str, word_count: int, rate: float, data_dir: str) -> dict:
+    """Benchmark one dictionary: startup, then a perfect replay at `rate` keys/s."""
+    cache = SessionCache(storage_file=os.path.join(data_dir, f"{name}.jsonl"))
+    try:
+        started = time.perf_counter()
+        cache.word_list(name)
+        load_ms = (time.perf_counter() - started) * 1000
+
+        # First test builds the storage; the replayed one reuses everything
+        started = time.perf_counter()
+        run_headless([], dict_name=name, word_count=word_count, cache=cache)
+        startup_ms = (time.perf_counter() - started) * 1000
+
+        run = run_headless(lambda test: keys_for_text(test.target_text, rate),
+                           dict_name=name, word_count=word_count, duration=3600,
+                           cache=cache)
+    finally:
+        cache.close()
+
+    latencies = [x * 1000 for x in run["key_latencies"]]
+    frame_bytes = run["frame_bytes"]
+    return {
+        "dictionary": name,
+        "load_ms": round(load_ms, 3),
+        "startup_ms": round(startup_ms, 3),
+        "keys": len(latencies),
+        "latency_mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "latency_p95_ms": round(_percentile(latencies, 95), 3),
+        "latency_max_ms": round(max(latencies, default=0.0), 3),
+        "fps": round(run["frames"] / run["elapsed"], 1) if run["elapsed"] else 0.0,
+        "bytes_per_frame": round(sum(frame_bytes) / len(frame_bytes), 1) if frame_bytes else 0.0,
+        "bytes_per_frame_max": max(frame_bytes, default=0),
+        "addstr_per_frame": round(run["addstr_calls"] / run["frames"], 1) if run["frames"] else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="benchmark.py",
+                                     description="Headless Monkey-CLI benchmarks.")
+    parser.add_argument("dicts", nargs="*", help="dictionaries to run (default: all in dicts/)")
+    parser.add_argument("-w", "--word-count", type=int, default=50, help="words per test.")
+    parser.add_argument("-r", "--rate", type=float, default=100.0, help="replayed keystrokes per second.")
+    parser.add_argument("--json", help="also write the report to this file.")
+    parser.add_argument("--max-latency-ms", type=float, help="fail if p95 key latency exceeds this.")
+    parser.add_argument("--max-bytes-per-frame", type=float, help="fail if mean bytes per frame exceed this.")
+    parser.add_argument("--max-startup-ms", type=float, help="fail if startup exceeds this.")
+    args = parser.parse_args()
+
+    names = args.dicts or sorted(n for n in os.listdir("dicts")
+                                 if os.path.isfile(os.path.join("dicts", n)))
+    with tempfile.TemporaryDirectory() as data_dir:
+        report = [bench_dictionary(n, args.word_count, args.rate, data_dir) for n in names]
+
+    columns = list(report[0]) if report else []
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in report:
+        print("  ".join(f"{row[c]:>14}" for c in columns))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    for row in report:
+        for limit, key in ((args.max_latency_ms, "latency_p95_ms"),
+                           (args.max_bytes_per_frame, "bytes_per_frame"),
+                           (args.max_startup_ms, "startup_ms")):
+            if limit is not None and row[key] > limit:
+                print(f"{row['dictionary']}: {key} {row[key]} > {limit}", file=sys.stderr)
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,60 +2,368 @@
 """
 Data storage module for Monkey-CLI.
 Handles persistence of typing test results and historical data.
+
+Results are kept in an append-only JSON Lines log: saving a result is a
+single O_APPEND write of one line, so its cost does not depend on how much
+history exists. A torn last line left by a crash is cut off on open, and
+the log can be compacted (optionally in a background thread).
+A RunningStats summary is kept next to the log and updated per result,
+and so is the per-key heatmap (see heatmap.py).
+
+Several processes may share one history (two terminals finishing tests at
+once). Every change to the log, the summary or the heatmap happens under
+an exclusive fcntl lock on a `.lock` file next to the log, so appends are
+never lost to a concurrent compaction and summaries are never updated
+from a stale copy. Each --profile keeps its own history in its own
+directory.
 """
 
+import fcntl
+import heapq
 import json
 import os
+import re
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
+
+from heatmap import Heatmap
+from options import BACKENDS, PROFILE_NAME
+from running_stats import RunningStats
+
+
+def build_result(wpm: float, accuracy: float,
+                 correct_chars: int, incorrect_chars: int,
+                 total_chars: int, duration: int,
+                 dictionary: Optional[str] = None, mode: Optional[str] = None,
+                 keystrokes: Optional[str] = None,
+                 timestamp: Optional[str] = None) -> Dict:
+    """
+    Build the record every storage backend saves for one test.
+
+    Args:
+        wpm: Words per minute
+        accuracy: Accuracy percentage
+        correct_chars: Number of correct characters
+        incorrect_chars: Number of incorrect characters
+        total_chars: Total characters typed
+        duration: Test duration in seconds
+        dictionary: Word list the test was generated from
+        mode: Kind of test that was run
+        keystrokes: Encoded keystroke timeline (see keystrokes.py)
+        timestamp: ISO timestamp of the test. If None, uses now.
+    """
+    return {
+        "timestamp": timestamp or datetime.now().isoformat(),
+        "wpm": round(wpm, 2),
+        "accuracy": round(accuracy, 2),
+        "correct_chars": correct_chars,
+        "incorrect_chars": incorrect_chars,
+        "total_chars": total_chars,
+        "duration": duration,
+        "dictionary": dictionary,
+        "mode": mode,
+        "keystrokes": keystrokes
+    }
+
+
+# Fields of a result other than its keystroke timeline, in record order
+SUMMARY_FIELDS = ("timestamp", "wpm", "accuracy", "correct_chars", "incorrect_chars",
+                  "total_chars", "duration", "dictionary", "mode")
+
+# The fields before "keystrokes" as _encode writes them (build_result key
+# order, plain ASCII strings); lets iter_summaries and summary_columns skip
+# the timeline that makes up most of a line. Anything else is parsed as JSON.
+_SUMMARY = re.compile(
+    rb'\{"timestamp":"([^"\\]*)","wpm":([-+.eE0-9]+),"accuracy":([-+.eE0-9]+),'
+    rb'"correct_chars":(-?[0-9]+),"incorrect_chars":(-?[0-9]+),"total_chars":(-?[0-9]+),'
+    rb'"duration":(-?[0-9]+),"dictionary":(null|"[^"\\]*"),"mode":(null|"[^"\\]*")[,}]')
+
+
+def _summary(line: bytes) -> Dict:
+    """A log line as a result without its keystroke timeline."""
+    m = _SUMMARY.match(line)
+    if m is None:
+        result = json.loads(line)
+        result.pop("keystrokes", None)
+        return result
+    ts, wpm, acc, correct, incorrect, total, duration, dictionary, mode = m.groups()
+    return {
+        "timestamp": ts.decode("ascii"),
+        "wpm": float(wpm),
+        "accuracy": float(acc),
+        "correct_chars": int(correct),
+        "incorrect_chars": int(incorrect),
+        "total_chars": int(total),
+        "duration": int(duration),
+        "dictionary": None if dictionary == b"null" else dictionary[1:-1].decode("utf-8"),
+        "mode": None if mode == b"null" else mode[1:-1].decode("utf-8"),
+    }
+
+
+def _summary_lines(f, wanted=None) -> Iterator[tuple]:
+    """
+    Stream (line, summary) pairs of a log, skipping unreadable lines.
+
+    Args:
+        f: Log opened in binary mode
+        wanted: Called with a line's _SUMMARY match; lines it rejects are
+            skipped before their summary is built
+    """
+    for line in f:
+        if not line.endswith(b"\n"):
+            break  # append still in flight
+        if wanted is not None:
+            m = _SUMMARY.match(line)
+            if m is not None and not wanted(m):
+                continue
+        try:
+            yield line, _summary(line)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+
+
+def _text_column(raw: tuple) -> List[Optional[str]]:
+    """Decode a column of matched JSON strings (or nulls), each distinct value once."""
+    texts = {v: None if v == b"null" else v[1:-1].decode("utf-8") for v in set(raw)}
+    return list(map(texts.__getitem__, raw))
+
+
+def _time_key(result: Dict) -> datetime:
+    """Sort key of a result: its timestamp as a naive local time."""
+    dt = datetime.fromisoformat(result["timestamp"])
+    return dt.astimezone().replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+
+def data_dir(profile: Optional[str] = None) -> Path:
+    """
+    Directory holding a profile's history, created if needed.
+
+    Args:
+        profile: Profile name; None is the default, unnamed profile
+
+    Raises:
+        ValueError: If the name could leave the profiles directory
+    """
+    directory = Path.home() / ".monkey-cli"
+    if profile is not None:
+        if not PROFILE_NAME.fullmatch(profile):
+            raise ValueError(f"invalid profile name: {profile!r}")
+        directory = directory / "profiles" / profile
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
 
 
 class DataStorage:
     """Manages storage and retrieval of typing test results."""
-    
-    def __init__(self, data_file: Optional[str] = None):
+
+    def __init__(self, data_file: Optional[str] = None,
+                 max_results: Optional[int] = None,
+                 fsync: bool = False,
+                 profile: Optional[str] = None):
         """
         Initialize data storage.
-        
+
         Args:
-            data_file: Path to the data file. If None, uses default location.
+            data_file: Path to the data file. If None, uses the profile's
+                default location.
+            max_results: Keep only this many results; the log is compacted
+                in the background once it holds twice as many. None keeps
+                the full history.
+            fsync: Flush every appended result to disk before returning.
+            profile: Profile whose history to use (see data_dir)
         """
         if data_file is None:
-            # Use user's home directory
-            home = Path.home()
-            data_dir = home / ".monkey-cli"
-            data_dir.mkdir(exist_ok=True)
-            self.data_file = data_dir / "history.json"
+            directory = data_dir(profile)
+            self.data_file = directory / "history.jsonl"
+            # Only the default profile predates the JSON Lines log
+            legacy_file = directory / "history.json" if profile is None else None
         else:
             self.data_file = Path(data_file)
-        
-        self._ensure_file_exists()
-    
-    def _ensure_file_exists(self):
-        """Ensure the data file exists."""
-        if not self.data_file.exists():
-            self._save_data([])
-    
+            legacy_file = None
+
+        self.stats_file = self.data_file.with_suffix(".stats.json")
+        self.heatmap_file = self.data_file.with_suffix(".heatmap")
+        self.lock_file = self.data_file.with_suffix(".lock")
+        self.max_results = max_results
+        self.fsync = fsync
+
+        # Running summary and the log size it accounts for
+        self._stats: Optional[RunningStats] = None
+        self._stats_size = -1
+
+        # Results parsed so far and how far into the log they reach
+        self._results: List[Dict] = []
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.RLock()
+        self._lock_fd: Optional[int] = None
+        self._lock_depth = 0
+        self._compactor: Optional[threading.Thread] = None
+
+        self._ensure_file_exists(legacy_file)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the history exclusively against other threads and processes.
+        Re-entrant: nested use keeps the one fcntl lock already held.
+        """
+        with self._lock:
+            if self._lock_depth == 0:
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+                self._lock_fd = fd
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0:
+                    # Closing the descriptor releases the lock
+                    os.close(self._lock_fd)
+                    self._lock_fd = None
+
+    def _ensure_file_exists(self, legacy_file: Optional[Path] = None):
+        """Ensure the data file exists, migrating or repairing it if needed."""
+        with self._locked():
+            if not self.data_file.exists():
+                records = []
+                if legacy_file is not None and legacy_file.exists():
+                    try:
+                        with open(legacy_file, 'r') as f:
+                            records = json.load(f)
+                    except (json.JSONDecodeError, OSError):
+                        records = []
+                self._rewrite(records)
+                if records:
+                    legacy_file.rename(legacy_file.with_suffix(".json.migrated"))
+            else:
+                self._recover_torn_tail()
+
+    def _recover_torn_tail(self):
+        """Cut off a partially written last record left by a crash (lock held)."""
+        with open(self.data_file, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    pos += newline + 1
+                    break
+            if pos != end:
+                f.truncate(pos)
+
+    @staticmethod
+    def _encode(result: Dict) -> bytes:
+        return (json.dumps(result, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def _rewrite(self, records: List[Dict]):
+        """Atomically replace the log with the given records (lock held)."""
+        tmp = self.data_file.with_name(f"{self.data_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(b"".join(self._encode(r) for r in records))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.data_file)
+        self._results = list(records)
+        st = self.data_file.stat()
+        self._offset, self._inode = st.st_size, st.st_ino
+        self._save_stats(RunningStats.from_results(records), self._offset)
+
+    def _save_stats(self, stats: RunningStats, log_size: int):
+        """Write the running summary, tagged with the log size it covers (lock held)."""
+        tmp = self.stats_file.with_name(f"{self.stats_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w') as f:
+            json.dump({"log_size": log_size, "stats": stats.to_dict()}, f)
+        os.replace(tmp, self.stats_file)
+        self._stats, self._stats_size = stats, log_size
+
+    def _current_stats(self) -> RunningStats:
+        """Get the running summary, rebuilding it if the log moved past it."""
+        with self._locked():
+            size = self.data_file.stat().st_size
+            if self._stats is not None and self._stats_size == size:
+                return self._stats
+            try:
+                with open(self.stats_file, 'r') as f:
+                    saved = json.load(f)
+                if saved["log_size"] == size:
+                    self._stats = RunningStats.from_dict(saved["stats"])
+                    self._stats_size = size
+                    return self._stats
+            except (OSError, json.JSONDecodeError, KeyError, TypeError):
+                pass
+            # Missing or stale (another writer, crash between writes): rescan once
+            self._save_stats(RunningStats.from_results(self._load_data()), size)
+            return self._stats
+
+    def _read_tail(self, count: int) -> List[Dict]:
+        """Parse only the last `count` records, reading the log backwards."""
+        with open(self.data_file, 'rb') as f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b""
+            while pos > 0 and tail.count(b"\n") <= count:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+        results = []
+        for line in tail.splitlines()[-count:]:
+            try:
+                results.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return results
+
     def _load_data(self) -> List[Dict]:
-        """Load data from file."""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return []
-    
-    def _save_data(self, data: List[Dict]):
-        """Save data to file."""
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
-    
-    def save_result(self, wpm: float, accuracy: float, 
-                   correct_chars: int, incorrect_chars: int, 
-                   total_chars: int, duration: int):
+        """Load data from file, parsing only what was appended since the last call."""
+        with self._lock:
+            try:
+                st = self.data_file.stat()
+            except FileNotFoundError:
+                self._results, self._offset = [], 0
+                return self._results
+
+            size = st.st_size
+            if size < self._offset or st.st_ino != self._inode:
+                # Log was compacted or cleared elsewhere; start over
+                self._results, self._offset, self._inode = [], 0, st.st_ino
+            if size == self._offset:
+                return self._results
+
+            with open(self.data_file, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            # Leave an unterminated tail (append still in flight) for next time
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    self._results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+            self._offset += end
+            return self._results
+
+    def save_result(self, wpm: float, accuracy: float,
+                   correct_chars: int, incorrect_chars: int,
+                   total_chars: int, duration: int,
+                   dictionary: Optional[str] = None, mode: Optional[str] = None,
+                   keystrokes: Optional[str] = None):
         """
         Save a typing test result.
-        
+
         Args:
             wpm: Words per minute
             accuracy: Accuracy percentage
@@ -63,45 +371,217 @@ class DataStorage:
             incorrect_chars: Number of incorrect characters
             total_chars: Total characters typed
             duration: Test duration in seconds
+            dictionary: Word list the test was generated from
+            mode: Kind of test that was run
+            keystrokes: Encoded keystroke timeline (see keystrokes.py)
         """
-        data = self._load_data()
-        
-        result = {
-            "timestamp": datetime.now().isoformat(),
-            "wpm": round(wpm, 2),
-            "accuracy": round(accuracy, 2),
-            "correct_chars": correct_chars,
-            "incorrect_chars": incorrect_chars,
-            "total_chars": total_chars,
-            "duration": duration
-        }
-        
-        data.append(result)
-        
-        # Keep only last 100 results to avoid file bloat
-        if len(data) > 100:
-            data = data[-100:]
-        
-        self._save_data(data)
-    
+        self.save_results([build_result(wpm, accuracy, correct_chars, incorrect_chars,
+                                        total_chars, duration, dictionary, mode,
+                                        keystrokes)])
+
+    def save_results(self, results: List[Dict], fsync: bool = False):
+        """
+        Append several results (see build_result) with one write.
+
+        Args:
+            results: Records to save, oldest first
+            fsync: Flush them to disk before returning (always done when
+                the storage was created with fsync=True)
+        """
+        if not results:
+            return
+        with self._locked():
+            stats = self._current_stats()
+            # A single write() on an O_APPEND descriptor lands as one unit
+            fd = os.open(self.data_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, b"".join(self._encode(r) for r in results))
+                if fsync or self.fsync:
+                    os.fsync(fd)
+                size = os.fstat(fd).st_size
+            finally:
+                os.close(fd)
+            for result in results:
+                stats.update(result)
+            self._save_stats(stats, size)
+
+        if self.max_results is not None and \
+                len(self._load_data()) >= 2 * self.max_results:
+            self.compact_in_background(self.max_results)
+
+    def merge_results(self, results: List[Dict]):
+        """
+        Add results from elsewhere (an import) in timestamp order.
+
+        Readers take log order for time order (get_recent_results, the
+        rolling and trend reports), so results no newer than the last one
+        stored are merged into place by streaming the log and them into a
+        new log once; newer ones are appended as by save_results.
+
+        Args:
+            results: Records to add, in any order
+        """
+        if not results:
+            return
+        results = sorted(results, key=_time_key)
+        with self._locked():
+            last = self._read_tail(1)
+            if not last or _time_key(last[0]) <= _time_key(results[0]):
+                self.save_results(results)
+                return
+            stats = RunningStats()
+            tmp = self.data_file.with_name(f"{self.data_file.name}.{os.getpid()}.tmp")
+            with open(self.data_file, 'rb') as log, open(tmp, 'wb') as f:
+                stored = ((_time_key(s), line, s) for line, s in _summary_lines(log))
+                incoming = ((_time_key(r), self._encode(r), r) for r in results)
+                for _, line, result in heapq.merge(stored, incoming, key=itemgetter(0)):
+                    f.write(line)
+                    stats.update(result)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.data_file)
+            # Parsed lazily again by the next _load_data
+            st = self.data_file.stat()
+            self._results, self._offset, self._inode = [], 0, st.st_ino
+            self._save_stats(stats, st.st_size)
+
+    def sync(self):
+        """Flush the log to disk."""
+        with self._lock:
+            fd = os.open(self.data_file, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def compact(self, keep_last: Optional[int] = None):
+        """
+        Rewrite the log without unreadable lines, optionally keeping only
+        the most recent results.
+
+        Args:
+            keep_last: Number of results to keep. None keeps all of them.
+        """
+        with self._locked():
+            data = self._load_data()
+            if keep_last is not None:
+                data = data[-keep_last:] if keep_last > 0 else []
+            self._rewrite(data)
+
+    def compact_in_background(self, keep_last: Optional[int] = None):
+        """Run compact() on a daemon thread unless one is already running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, args=(keep_last,),
+                                           daemon=True)
+        self._compactor.start()
+
     def get_all_results(self) -> List[Dict]:
         """Get all stored results."""
-        return self._load_data()
-    
-    def get_recent_results(self, count: int = 10) -> List[Dict]:
-        """Get the most recent N results."""
-        data = self._load_data()
-        return data[-count:] if len(data) >= count else data
-    
-    def get_statistics(self) -> Dict:
-        """
-        Get overall statistics.
-        
+        return list(self._load_data())
+
+    def iter_results(self) -> Iterator[Dict]:
+        """Stream stored results oldest first without keeping them in memory."""
+        with open(self.data_file, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # append still in flight
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def iter_summaries(self) -> Iterator[Dict]:
+        """
+        Stream stored results oldest first without their keystroke
+        timelines; several times cheaper than iter_results for reports.
+        """
+        with open(self.data_file, 'rb') as f:
+            for _, summary in _summary_lines(f):
+                yield summary
+
+    def summary_columns(self, block_size: int = 1 << 20) -> Dict[str, list]:
+        """
+        Every stored result without its timeline, as one list per field
+        (see SUMMARY_FIELDS), oldest first: for reports over the whole
+        history. The log is read in blocks; each block's records are
+        matched with one findall and converted column by column, so no
+        per-result dict or JSON parse is involved unless a block holds a
+        line in another format.
+        """
+        columns = {field: [] for field in SUMMARY_FIELDS}
+        with open(self.data_file, 'rb') as f:
+            rest = b""
+            while True:
+                data = f.read(block_size)
+                if not data:
+                    break  # an unterminated `rest` is an append still in flight
+                block = rest + data
+                end = block.rfind(b"\n") + 1
+                block, rest = block[:end], block[end:]
+                found = _SUMMARY.findall(block)
+                if len(found) != block.count(b"\n"):
+                    self._summary_rows(block, columns)
+                elif found:
+                    fields = list(zip(*found))
+                    columns["timestamp"] += map(bytes.decode, fields[0])
+                    columns["wpm"] += map(float, fields[1])
+                    columns["accuracy"] += map(float, fields[2])
+                    for field, raw in zip(SUMMARY_FIELDS[3:7], fields[3:7]):
+                        columns[field] += map(int, raw)
+                    columns["dictionary"] += _text_column(fields[7])
+                    columns["mode"] += _text_column(fields[8])
+        return columns
+
+    @staticmethod
+    def _summary_rows(block: bytes, columns: Dict[str, list]):
+        """Add a block's records to summary columns one line at a time."""
+        for line in block.splitlines():
+            try:
+                result = _summary(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            for field in SUMMARY_FIELDS:
+                columns[field].append(result.get(field))
+
+    @staticmethod
+    def _filter(data: List[Dict], dictionary: Optional[str], mode: Optional[str],
+                duration: Optional[int]) -> List[Dict]:
+        """Keep only results matching the given filters."""
+        if dictionary is None and mode is None and duration is None:
+            return data
+        return [r for r in data
+                if (dictionary is None or r.get("dictionary") == dictionary)
+                and (mode is None or r.get("mode") == mode)
+                and (duration is None or r.get("duration") == duration)]
+
+    def get_recent_results(self, count: int = 10, dictionary: Optional[str] = None,
+                           mode: Optional[str] = None,
+                           duration: Optional[int] = None) -> List[Dict]:
+        """Get the most recent N results, optionally filtered."""
+        if dictionary is None and mode is None and duration is None:
+            with self._lock:
+                if self._offset != self.data_file.stat().st_size:
+                    return self._read_tail(count)
+        data = self._filter(self._load_data(), dictionary, mode, duration)
+        return data[-count:] if len(data) >= count else list(data)
+
+    def get_statistics(self, dictionary: Optional[str] = None,
+                       mode: Optional[str] = None,
+                       duration: Optional[int] = None) -> Dict:
+        """
+        Get overall statistics, optionally filtered.
+
         Returns:
             Dict with average WPM, accuracy, best WPM, total tests, etc.
+            Unfiltered statistics come from the running summary and also
+            include spread and percentile figures.
         """
-        data = self._load_data()
-        
+        if dictionary is None and mode is None and duration is None:
+            return self._current_stats().summary()
+
+        data = self._filter(self._load_data(), dictionary, mode, duration)
+
         if not data:
             return {
                 "total_tests": 0,
@@ -111,10 +591,10 @@ class DataStorage:
                 "best_accuracy": 0.0,
                 "total_chars": 0
             }
-        
+
         wpms = [r["wpm"] for r in data]
         accuracies = [r["accuracy"] for r in data]
-        
+
         return {
             "total_tests": len(data),
             "average_wpm": round(sum(wpms) / len(wpms), 2),
@@ -123,7 +603,68 @@ class DataStorage:
             "best_accuracy": round(max(accuracies), 2),
             "total_chars": sum(r["total_chars"] for r in data)
         }
-    
+
+    def get_best_result(self, dictionary: Optional[str] = None,
+                        mode: Optional[str] = None,
+                        duration: Optional[int] = None) -> Optional[Dict]:
+        """
+        Get the highest-WPM result that has a keystroke timeline, optionally
+        filtered. Streams the log, rejecting most lines by their WPM alone;
+        only a line that beats the best so far is parsed in full.
+        """
+        best = None
+        with open(self.data_file, 'rb') as f:
+            for line, summary in _summary_lines(f, lambda m: best is None or
+                                                float(m[2]) > best["wpm"]):
+                if (best is None or summary["wpm"] > best["wpm"]) \
+                        and self._filter([summary], dictionary, mode, duration):
+                    result = json.loads(line)
+                    if result.get("keystrokes"):
+                        best = result
+        return best
+
+    def get_heatmap(self) -> Heatmap:
+        """Get the accumulated per-key heatmap."""
+        try:
+            with open(self.heatmap_file, 'rb') as f:
+                return Heatmap.from_bytes(f.read())
+        except OSError:
+            return Heatmap()
+
+    def merge_heatmap(self, heatmap: Heatmap):
+        """Add one or more tests' heatmap counters to the stored heatmap."""
+        with self._locked():
+            total = self.get_heatmap()
+            total.merge(heatmap)
+            tmp = self.heatmap_file.with_name(f"{self.heatmap_file.name}.{os.getpid()}.tmp")
+            with open(tmp, 'wb') as f:
+                f.write(total.to_bytes())
+            os.replace(tmp, self.heatmap_file)
+
     def clear_history(self):
-        """Clear all stored results."""
-        self._save_data([])
+        """Clear all stored results and the heatmap."""
+        with self._locked():
+            self._rewrite([])
+            try:
+                self.heatmap_file.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def open_storage(backend: str = "jsonl", data_file: Optional[str] = None,
+                 profile: Optional[str] = None):
+    """
+    Create the storage backend with the given name.
+
+    Args:
+        backend: "jsonl" for the append-only log, "sqlite" for SQLite
+        data_file: Path to the data file. If None, uses the profile's
+            default location.
+        profile: Profile whose history to use (see data_dir)
+    """
+    if backend == "sqlite":
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(data_file, profile)
+    if backend == "jsonl":
+        return DataStorage(data_file, profile=profile)
+    raise ValueError(f"unknown storage backend: {backend}")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Ghost runs for Monkey-CLI (--ghost).
+
+A stored test's keystroke timeline is replayed as a second cursor that
+moves at the pace of that run. The timeline is read straight from its
+stored delta encoding (see keystrokes.decode) through a single forward
+cursor: each frame only steps over the keystrokes that happened since the
+previous frame, and nothing is kept but the current position.
+"""
+
+from typing import Dict, Optional
+
+from keystrokes import decode
+
+# Key codes the timeline records for a deleted character
+# (curses.KEY_BACKSPACE, DEL, ^H)
+_BACKSPACE = (263, 127, 8)
+
+
+class Ghost:
+    """Cursor replaying a stored keystroke timeline against the clock."""
+
+    def __init__(self, blob: str, wpm: float = 0.0):
+        """
+        Args:
+            blob: Encoded keystroke timeline (KeystrokeBuffer.encode)
+            wpm: WPM of the stored run, for display
+        """
+        self.wpm = wpm
+        self.position = 0
+        self._timeline = decode(blob)
+        self._next = next(self._timeline, None)
+
+    @classmethod
+    def best(cls, storage, dictionary: Optional[str] = None, mode: Optional[str] = None,
+             duration: Optional[int] = None) -> Optional["Ghost"]:
+        """Ghost of the fastest stored run with a timeline, or None if there is none."""
+        return cls.of(storage.get_best_result(dictionary, mode, duration))
+
+    @classmethod
+    def of(cls, result: Optional[Dict]) -> Optional["Ghost"]:
+        """Ghost replaying a result with a timeline, or None for no result."""
+        if result is None:
+            return None
+        return cls(result["keystrokes"], result["wpm"])
+
+    @property
+    def finished(self) -> bool:
+        return self._next is None
+
+    def advance(self, elapsed: float) -> int:
+        """
+        Replay every keystroke up to `elapsed` seconds after the first one.
+
+        Args:
+            elapsed: Seconds since the live test started; never decreases
+
+        Returns:
+            The ghost's position in the text
+        """
+        record = self._next
+        while record is not None and record[0] <= elapsed:
+            _, key, position, _ = record
+            # Backspaces store where the cursor ended up, other keys where they typed
+            self.position = position if key in _BACKSPACE else position + 1
+            record = next(self._timeline, None)
+        self._next = record
+        return self.position
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Headless backend for Monkey-CLI.
+A stand-in for the curses screen that keeps a virtual cell grid, counts
+the cells and (estimated) bytes each frame would send to a terminal, and
+delivers scripted or recorded keystrokes at a given rate.
+"""
+
+import curses
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from keystrokes import decode
+
+# Rough cost of terminal control sequences, for byte estimates
+_MOVE_BYTES = 8      # ESC [ row ; col H
+_ATTR_BYTES = 6      # ESC [ ... m
+
+
+class HeadlessTerminal:
+    """Screen-global curses calls, recorded instead of sent to a terminal."""
+
+    def __init__(self, screen: "FakeScreen"):
+        self.screen = screen
+        self.frames = 0
+        self.frame_bytes: List[int] = []
+        self.frame_times: List[float] = []
+        # Seconds from a key being read to the frame that showed it
+        self.key_latencies: List[float] = []
+
+    def curs_set(self, visibility: int):
+        return 1
+
+    def init_pair(self, pair: int, fg: int, bg: int):
+        pass
+
+    def color_pair(self, pair: int) -> int:
+        return pair << 8
+
+    def doupdate(self):
+        now = time.perf_counter()
+        self.frames += 1
+        self.frame_bytes.append(self.screen.present())
+        self.frame_times.append(now)
+        for delivered in self.screen.take_delivered():
+            self.key_latencies.append(now - delivered)
+
+
+class FakeScreen:
+    """Minimal curses window: a cell grid plus a keystroke script."""
+
+    def __init__(self, height: int = 24, width: int = 80,
+                 keys: Iterable[Tuple[float, int]] = (), realtime: bool = True):
+        """
+        Initialize the screen.
+
+        Args:
+            height: Number of rows
+            width: Number of columns
+            keys: (seconds from start, key code) pairs, in order
+            realtime: Deliver keys at their scripted times; if False every
+                key is available immediately
+        """
+        self.height, self.width = height, width
+        self._window = self._blank()
+        self._virtual = self._blank()
+        self._physical = self._blank()
+        self._cursor = (0, 0)
+        self._timeout = -1
+        self._realtime = realtime
+        self._delivered: List[float] = []
+        self.bytes_written = 0
+        self.addstr_calls = 0
+        self.set_keys(keys)
+
+    def set_keys(self, keys: Iterable[Tuple[float, int]]):
+        """Replace the keystroke script; its times count from now."""
+        self._keys = list(keys)
+        self._next_key = 0
+        self._started = time.perf_counter()
+
+    def _blank(self) -> List[List[Tuple[str, int]]]:
+        return [[(" ", 0)] * self.width for _ in range(self.height)]
+
+    # -- window API used by Monkey-CLI ------------------------------------
+
+    def getmaxyx(self) -> Tuple[int, int]:
+        return self.height, self.width
+
+    def addstr(self, row: int, col: int, text: str, attr: int = 0):
+        self.addstr_calls += 1
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise curses.error("addstr() returned ERR")
+        line = self._window[row]
+        for i, ch in enumerate(text):
+            if col + i >= self.width:
+                raise curses.error("addstr() returned ERR")
+            line[col + i] = (ch, attr)
+        self._cursor = (row, min(col + len(text), self.width - 1))
+
+    def move(self, row: int, col: int):
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise curses.error("wmove() returned ERR")
+        self._cursor = (row, col)
+
+    def clrtoeol(self):
+        row, col = self._cursor
+        line = self._window[row]
+        for c in range(col, self.width):
+            line[c] = (" ", 0)
+
+    def erase(self):
+        self._window = self._blank()
+
+    def clear(self):
+        self._window = self._blank()
+        self._physical = [[("", -1)] * self.width for _ in range(self.height)]
+
+    def noutrefresh(self):
+        self._virtual = [list(line) for line in self._window]
+
+    def refresh(self):
+        self.noutrefresh()
+        self.present()
+
+    def keypad(self, flag: bool):
+        pass
+
+    def nodelay(self, flag: bool):
+        self._timeout = 0 if flag else -1
+
+    def timeout(self, ms: int):
+        self._timeout = ms
+
+    def getch(self) -> int:
+        if self._next_key >= len(self._keys):
+            if self._timeout < 0:
+                # Script finished and the app would block forever: quit
+                raise KeyboardInterrupt
+            time.sleep(self._timeout / 1000)
+            return -1
+
+        due, key = self._keys[self._next_key]
+        if self._realtime:
+            wait = self._started + due - time.perf_counter()
+            if wait > 0:
+                if 0 <= self._timeout < wait * 1000:
+                    time.sleep(self._timeout / 1000)
+                    return -1
+                time.sleep(wait)
+        self._next_key += 1
+        self._delivered.append(time.perf_counter())
+        return key
+
+    # -- bookkeeping for HeadlessTerminal ---------------------------------
+
+    def present(self) -> int:
+        """Diff the virtual screen against the physical one, as doupdate
+        does, and return the estimated bytes sent."""
+        sent = 0
+        for row in range(self.height):
+            virtual, physical = self._virtual[row], self._physical[row]
+            if virtual == physical:
+                continue
+            last_col, last_attr = None, None
+            for col in range(self.width):
+                cell = virtual[col]
+                if cell == physical[col]:
+                    continue
+                if last_col != col - 1:
+                    sent += _MOVE_BYTES
+                if cell[1] != last_attr:
+                    sent += _ATTR_BYTES
+                    last_attr = cell[1]
+                sent += len(cell[0].encode("utf-8"))
+                last_col = col
+            self._physical[row] = list(virtual)
+        self.bytes_written += sent
+        return sent
+
+    def take_delivered(self) -> List[float]:
+        delivered, self._delivered = self._delivered, []
+        return delivered
+
+    def row_text(self, row: int) -> str:
+        """What the terminal currently shows on a row."""
+        return "".join(ch for ch, _ in self._physical[row])
+
+
+def keys_for_text(text: str, rate: Optional[float] = None) -> List[Tuple[float, int]]:
+    """
+    Script typing `text` perfectly.
+
+    Args:
+        text: Characters to type
+        rate: Keystrokes per second; None delivers them all at once
+    """
+    step = 1 / rate if rate else 0.0
+    return [(i * step, ord(ch)) for i, ch in enumerate(text)]
+
+
+def keys_from_timeline(blob: str, speed: float = 1.0) -> List[Tuple[float, int]]:
+    """Script a stored keystroke timeline (see keystrokes.encode)."""
+    return [(elapsed / speed, key) for elapsed, key, _, _ in decode(blob)]
+
+
+def run_headless(keys, height: int = 24, width: int = 80,
+                 realtime: bool = True, **test_args) -> Dict:
+    """
+    Run one TypingTest against a FakeScreen and report what it cost.
+
+    Args:
+        keys: (seconds from start, key code) script, or a callable that
+            takes the constructed TypingTest and returns one (e.g. to type
+            its own target text)
+        height, width: Terminal size to emulate
+        realtime: Deliver keys at their scripted times
+        test_args: Passed through to TypingTest (duration, word_count,
+            dict_name, cache, ...)
+
+    Returns:
+        Dict with the finished test, frame count, bytes per frame and
+        per-key input-to-frame latencies.
+    """
+    from typing_test import TypingTest
+
+    screen = FakeScreen(height, width, realtime=realtime)
+    term = HeadlessTerminal(screen)
+    test = TypingTest(screen, term=term, **test_args)
+    screen.set_keys(keys(test) if callable(keys) else keys)
+    started = time.perf_counter()
+    test.run()
+    elapsed = time.perf_counter() - started
+    return {
+        "test": test,
+        "screen": screen,
+        "elapsed": elapsed,
+        "frames": term.frames,
+        "frame_bytes": term.frame_bytes,
+        "key_latencies": term.key_latencies,
+        "addstr_calls": screen.addstr_calls,
+    }
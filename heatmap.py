@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Per-key and per-bigram typing heatmap for Monkey-CLI.
+Attempts, errors and cumulative latency are counted in fixed-size arrays
+indexed by the character code of the target character (and of the one
+before it, for bigrams), so recording a keystroke is O(1), merging is a
+pass over flat arrays, and the serialized form is a fixed-size blob that
+loads without parsing.
+"""
+
+import struct
+from array import array
+from operator import add
+from typing import List, Optional, Tuple
+
+# Character codes tracked: 7-bit ASCII
+SIZE = 128
+
+# Pauses longer than this (seconds) count as this long, so a break
+# mid-test does not swamp a key's average latency
+LATENCY_CAP = 2.0
+
+# Fewest attempts before a key or bigram is ranked
+MIN_ATTEMPTS = 20
+
+_MAGIC = b"MKHM"
+_VERSION = 2
+_HEADER = struct.Struct("=4sII")
+
+
+def _zeros(typecode: str, n: int) -> array:
+    return array(typecode, bytes(array(typecode).itemsize * n))
+
+
+class Heatmap:
+    """Attempt, error and latency counters per key and per key pair."""
+
+    def __init__(self):
+        self.attempts = _zeros("I", SIZE)
+        self.errors = _zeros("I", SIZE)
+        self.latency_us = _zeros("Q", SIZE)
+        # Indexed by previous * SIZE + current
+        self.pair_attempts = _zeros("I", SIZE * SIZE)
+        self.pair_errors = _zeros("I", SIZE * SIZE)
+        self.pair_latency_us = _zeros("Q", SIZE * SIZE)
+        # Attempts with a latency: all but the first key of each test.
+        # Pairs need no such count, a test's first key has no pair.
+        self.timed = _zeros("I", SIZE)
+
+    def _arrays(self) -> Tuple[array, ...]:
+        # Version 1 blobs hold all but the last array
+        return (self.attempts, self.errors, self.latency_us,
+                self.pair_attempts, self.pair_errors, self.pair_latency_us,
+                self.timed)
+
+    def __bool__(self) -> bool:
+        return any(self.attempts)
+
+    def record(self, previous: Optional[str], expected: str, correct: bool,
+               latency: Optional[float]):
+        """
+        Count one keystroke.
+
+        Args:
+            previous: Target character before this one, or None at the start
+            expected: Target character the key was meant to type
+            correct: Whether the right key was pressed
+            latency: Seconds since the previous keystroke, or None for the
+                first key of a test
+        """
+        code = ord(expected)
+        if code >= SIZE:
+            return
+        self.attempts[code] += 1
+        if not correct:
+            self.errors[code] += 1
+        if latency is None:
+            return
+        micros = int(min(latency, LATENCY_CAP) * 1_000_000)
+        self.timed[code] += 1
+        self.latency_us[code] += micros
+        if previous is not None and ord(previous) < SIZE:
+            pair = ord(previous) * SIZE + code
+            self.pair_attempts[pair] += 1
+            self.pair_latency_us[pair] += micros
+            if not correct:
+                self.pair_errors[pair] += 1
+
+    def merge(self, other: "Heatmap"):
+        """Add another heatmap's counters to this one."""
+        for mine, theirs in zip(self._arrays(), other._arrays()):
+            mine[:] = array(mine.typecode, map(add, mine, theirs))
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, _VERSION, SIZE) + b"".join(a.tobytes() for a in self._arrays())
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "Heatmap":
+        """Load a serialized heatmap; anything unrecognized gives an empty one."""
+        heatmap = cls()
+        try:
+            magic, version, size = _HEADER.unpack_from(blob, 0)
+        except struct.error:
+            return heatmap
+        if magic != _MAGIC or version not in (1, _VERSION) or size != SIZE:
+            return heatmap
+        arrays = heatmap._arrays()
+        offset = _HEADER.size
+        for a in arrays if version == _VERSION else arrays[:-1]:
+            n = len(a) * a.itemsize
+            chunk = blob[offset:offset + n]
+            if len(chunk) != n:
+                return cls()
+            a[:] = array(a.typecode, chunk)
+            offset += n
+        if version == 1:
+            heatmap.timed[:] = heatmap.attempts  # every attempt was timed
+        return heatmap
+
+    def key_stats(self, code: int) -> Tuple[int, float, float]:
+        """(attempts, error rate in %, mean latency in ms) of one key."""
+        n = self.attempts[code]
+        if not n:
+            return 0, 0.0, 0.0
+        timed = self.timed[code]
+        return n, 100.0 * self.errors[code] / n, self.latency_us[code] / timed / 1000 if timed else 0.0
+
+    def weakest_keys(self, count: int = 5, min_attempts: int = MIN_ATTEMPTS) -> List[Tuple[str, int, float, float]]:
+        """
+        Keys with the highest error rate (ties broken by latency).
+
+        Returns:
+            (key, attempts, error rate %, mean latency ms), worst first
+        """
+        ranked = [(chr(c),) + self.key_stats(c) for c in range(32, SIZE - 1)
+                  if self.attempts[c] >= min_attempts]
+        ranked.sort(key=lambda k: (-k[2], -k[3]))
+        return ranked[:count]
+
+    def weakest_bigrams(self, count: int = 10, min_attempts: int = MIN_ATTEMPTS) -> List[Tuple[str, int, float, float]]:
+        """
+        Key pairs with the highest error rate (ties broken by latency).
+
+        Returns:
+            (pair, attempts, error rate %, mean latency ms), worst first
+        """
+        ranked = []
+        for pair, n in enumerate(self.pair_attempts):
+            if n >= min_attempts:
+                ranked.append((chr(pair // SIZE) + chr(pair % SIZE), n,
+                               100.0 * self.pair_errors[pair] / n,
+                               self.pair_latency_us[pair] / n / 1000))
+        ranked.sort(key=lambda k: (-k[2], -k[3]))
+        return ranked[:count]
+
+    def drill_keys(self, count: int = 5) -> Optional[str]:
+        """Letters to practice (for --drill auto), or None without enough data."""
+        keys = [k for k, _, rate, _ in self.weakest_keys(SIZE) if k.isalpha() and rate > 0]
+        return "".join(keys[:count]) or None
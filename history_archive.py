@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Columnar history archives for Monkey-CLI (`export` / `import`).
+
+Results are written in chunks of up to CHUNK_RESULTS. Each chunk stores
+one packed array per field: timestamps as microsecond deltas, WPM and
+accuracy in hundredths (they are stored rounded to two places), character
+counts and durations as integers, dictionary and mode as indexes into a
+small string table, and keystroke timelines as lengths plus one blob. The
+columns are compressed together with zlib, so a chunk is one read, one
+decompress and a few array loads. Arrays are little-endian so an archive
+moves between machines.
+
+File layout:
+    header : magic, version
+    chunk  : result count, compressed size, zlib(columns)...
+    column : byte length, bytes (_NUMERIC, then table and indexes of
+             each _TEXT field, then keystroke lengths and blob)
+"""
+
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_MAGIC = b"MKHX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sI")
+_CHUNK = struct.Struct("<II")
+_LENGTH = struct.Struct("<I")
+
+# Results per chunk: what an import holds in memory and saves at once
+CHUNK_RESULTS = 65536
+
+# (field, array typecode) of the numeric columns, in file order
+_NUMERIC = (("timestamp", "q"), ("wpm", "I"), ("accuracy", "I"),
+            ("correct_chars", "I"), ("incorrect_chars", "I"),
+            ("total_chars", "I"), ("duration", "I"))
+_TEXT = ("dictionary", "mode")
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NONE = 0xFFFFFFFF  # keystroke length of a result without a timeline
+
+
+def timestamp_micros(timestamp: str) -> int:
+    """Microseconds since 1970 of a stored (local, naive) ISO timestamp."""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _little(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+
+def _load(typecode: str, data: bytes) -> array:
+    a = array(typecode, data)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+
+def _encode_chunk(results: List[Dict], keystrokes: bool) -> bytes:
+    columns = {field: array(typecode) for field, typecode in _NUMERIC}
+    tables = {field: {} for field in _TEXT}
+    indexes = {field: array("I") for field in _TEXT}
+    lengths, blobs = array("I"), []
+
+    previous = 0
+    for r in results:
+        micros = timestamp_micros(r["timestamp"])
+        columns["timestamp"].append(micros - previous)
+        previous = micros
+        columns["wpm"].append(round(r["wpm"] * 100))
+        columns["accuracy"].append(round(r["accuracy"] * 100))
+        for field in ("correct_chars", "incorrect_chars", "total_chars", "duration"):
+            columns[field].append(r[field])
+        for field in _TEXT:
+            indexes[field].append(tables[field].setdefault(r.get(field), len(tables[field])))
+        timeline = r.get("keystrokes") if keystrokes else None
+        if timeline is None:
+            lengths.append(_NONE)
+        else:
+            blob = timeline.encode("ascii")
+            lengths.append(len(blob))
+            blobs.append(blob)
+
+    parts = [_little(columns[field]) for field, _ in _NUMERIC]
+    for field in _TEXT:
+        parts.append(json.dumps(list(tables[field])).encode("utf-8"))
+        parts.append(_little(indexes[field]))
+    parts += [_little(lengths), b"".join(blobs)]
+    payload = zlib.compress(b"".join(_LENGTH.pack(len(p)) + p for p in parts), 6)
+    return _CHUNK.pack(len(results), len(payload)) + payload
+
+
+def _decode_chunk(count: int, payload: bytes) -> Iterator[Dict]:
+    data = zlib.decompress(payload)
+    parts, offset = [], 0
+    while offset < len(data):
+        (n,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        parts.append(data[offset:offset + n])
+        offset += n
+    parts.reverse()
+
+    columns = {field: _load(typecode, parts.pop()) for field, typecode in _NUMERIC}
+    texts = {}
+    for field in _TEXT:
+        table = json.loads(parts.pop())
+        texts[field] = (table, _load("I", parts.pop()))
+    lengths, blob = _load("I", parts.pop()), parts.pop()
+    if any(len(c) != count for c in columns.values()) or len(lengths) != count:
+        raise ValueError("corrupted archive chunk")
+
+    micros, start = 0, 0
+    for i in range(count):
+        micros += columns["timestamp"][i]
+        length = lengths[i]
+        if length == _NONE:
+            timeline = None
+        else:
+            timeline = blob[start:start + length].decode("ascii")
+            start += length
+        yield {
+            "timestamp": (_EPOCH + micros * _MICROSECOND).isoformat(),
+            "wpm": columns["wpm"][i] / 100,
+            "accuracy": columns["accuracy"][i] / 100,
+            "correct_chars": columns["correct_chars"][i],
+            "incorrect_chars": columns["incorrect_chars"][i],
+            "total_chars": columns["total_chars"][i],
+            "duration": columns["duration"][i],
+            "dictionary": texts["dictionary"][0][texts["dictionary"][1][i]],
+            "mode": texts["mode"][0][texts["mode"][1][i]],
+            "keystrokes": timeline,
+        }
+
+
+def write_archive(results: Iterable[Dict], f: BinaryIO, keystrokes: bool = True) -> int:
+    """
+    Write results as an archive.
+
+    Args:
+        results: Results to export, e.g. storage.iter_results()
+        f: Binary file to write to
+        keystrokes: Include keystroke timelines (the bulk of a history)
+
+    Returns:
+        Number of results written
+    """
+    f.write(_HEADER.pack(_MAGIC, _VERSION))
+    total, chunk = 0, []
+    for result in results:
+        chunk.append(result)
+        if len(chunk) == CHUNK_RESULTS:
+            f.write(_encode_chunk(chunk, keystrokes))
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        f.write(_encode_chunk(chunk, keystrokes))
+        total += len(chunk)
+    return total
+
+
+def read_chunks(f: BinaryIO) -> Iterator[List[Dict]]:
+    """
+    Stream an archive one chunk of results at a time.
+
+    Raises:
+        ValueError: If the file is not an archive or is cut short
+    """
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size or _HEADER.unpack(header) != (_MAGIC, _VERSION):
+        raise ValueError("not a Monkey-CLI history archive")
+    while True:
+        head = f.read(_CHUNK.size)
+        if not head:
+            return
+        if len(head) != _CHUNK.size:
+            raise ValueError("archive is truncated")
+        count, size = _CHUNK.unpack(head)
+        payload = f.read(size)
+        if len(payload) != size:
+            raise ValueError("archive is truncated")
+        try:
+            chunk = list(_decode_chunk(count, payload))
+        except (zlib.error, struct.error, IndexError, UnicodeDecodeError) as e:
+            raise ValueError(f"corrupted archive chunk: {e}") from e
+        yield chunk
+
+
+def import_archive(storage, f: BinaryIO, existing: Optional[set] = None) -> Tuple[int, int]:
+    """
+    Add an archive's results to a storage backend, skipping any whose
+    timestamp is already in the history (or earlier in the archive).
+
+    Args:
+        storage: Backend with iter_summaries() and merge_results()
+        f: Binary file to read
+        existing: Timestamps (see timestamp_micros) already stored; read
+            from the storage when None
+
+    Returns:
+        (results imported, results skipped)
+    """
+    if existing is None:
+        existing = {timestamp_micros(r["timestamp"]) for r in storage.iter_summaries()}
+    imported = skipped = 0
+    for chunk in read_chunks(f):
+        fresh = []
+        for result in chunk:
+            key = timestamp_micros(result["timestamp"])
+            if key in existing:
+                skipped += 1
+                continue
+            existing.add(key)
+            fresh.append(result)
+        # One save per chunk: a single append, rewrite or transaction
+        storage.merge_results(fresh)
+        imported += len(fresh)
+    return imported, skipped
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Input state for Monkey-CLI.
+Tracks what has been typed against the target text with O(1) append,
+delete and completion checks, and a per-position status array the
+renderer reads correctness from.
+"""
+
+# Per-position status values
+UNTYPED = 0
+CORRECT = 1
+INCORRECT = 2
+# Returned for characters typed past the end of the target text
+OVERFLOW = 3
+
+
+class InputState:
+    """
+    Mutable typing buffer with a running mismatch count.
+
+    Positions are absolute. Everything before `base` has been trimmed
+    away (endless mode) and can no longer be edited.
+    """
+
+    def __init__(self, target):
+        """
+        Initialize the input state.
+
+        Args:
+            target: Text the user is supposed to type (a str, or a
+                WordStream that grows as the cursor advances)
+        """
+        self.target = target
+        self.base = 0
+        self.typed = bytearray()
+        self.status = bytearray(len(target))
+        self.mismatches = 0
+
+    @property
+    def position(self) -> int:
+        """Number of characters typed so far (the cursor position)."""
+        return self.base + len(self.typed)
+
+    @property
+    def complete(self) -> bool:
+        """Whether the typed text matches the whole target exactly."""
+        return self.position == len(self.target) and self.mismatches == 0
+
+    @property
+    def text(self) -> str:
+        """The typed text still held (O(n); for display and debugging only)."""
+        return self.typed.decode("ascii")
+
+    def statuses(self, start: int, end: int) -> bytes:
+        """Status values for absolute positions [start, end)."""
+        return bytes(self.status[start - self.base:end - self.base])
+
+    def append(self, char: int) -> int:
+        """
+        Type one printable ASCII character.
+
+        Returns:
+            CORRECT, INCORRECT or OVERFLOW
+        """
+        pos = self.position
+        self.typed.append(char)
+        if pos >= len(self.target):
+            self.mismatches += 1
+            return OVERFLOW
+        index = pos - self.base
+        if index >= len(self.status):
+            # The target grew since the last key
+            self.status.extend(bytes(len(self.target) - self.base - len(self.status)))
+        if chr(char) == self.target[pos]:
+            self.status[index] = CORRECT
+            return CORRECT
+        self.status[index] = INCORRECT
+        self.mismatches += 1
+        return INCORRECT
+
+    def delete(self) -> int:
+        """
+        Remove the last typed character.
+
+        Returns:
+            The status the removed character had, or UNTYPED if nothing
+            editable was typed.
+        """
+        if not self.typed:
+            return UNTYPED
+        self.typed.pop()
+        pos = self.position
+        if pos >= len(self.target):
+            self.mismatches -= 1
+            return OVERFLOW
+        index = pos - self.base
+        status = self.status[index]
+        self.status[index] = UNTYPED
+        if status == INCORRECT:
+            self.mismatches -= 1
+        return status
+
+    def trim(self, base: int):
+        """Forget typed characters before absolute position `base`."""
+        drop = min(base, self.position) - self.base
+        if drop > 0:
+            del self.typed[:drop]
+            del self.status[:drop]
+            self.base += drop
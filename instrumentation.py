@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Frame-time and input-latency instrumentation for Monkey-CLI (--instrument).
+
+Each phase of the main loop (drawing, flushing to the terminal, handling
+input) and the delay from a key being read to the frame that shows it are
+timed with perf_counter and counted into fixed log-spaced histogram
+buckets, so recording is O(1) with no allocation and percentiles can be
+reported at any time. Comparing "flush"/"doupdate" against the draw and
+input phases shows whether terminal I/O or Python logic is slow.
+"""
+
+import json
+import math
+import os
+import time
+from array import array
+from typing import Dict, Optional
+
+# Histogram buckets: upper bounds grow by sqrt(2) from 1us, up to ~70s
+_BUCKET_RATIO = math.sqrt(2)
+_BUCKETS = 53
+_BOUNDS_US = [_BUCKET_RATIO ** i for i in range(_BUCKETS)]
+
+# Phases shown on the debug overlay, in order
+OVERLAY_PHASES = ("frame", "flush", "doupdate", "input", "key_to_screen")
+
+# Seconds between overlay refreshes, so it does not redraw every frame
+OVERLAY_INTERVAL = 0.5
+
+
+class Histogram:
+    """Log-bucketed duration histogram with count, mean and max."""
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        micros = seconds * 1_000_000
+        bucket = 0 if micros <= 1 else min(_BUCKETS - 1, math.ceil(math.log(micros, _BUCKET_RATIO)))
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (seconds) of the bucket holding the q-th percentile."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(_BOUNDS_US[bucket] / 1_000_000, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        ms = 1000
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * ms, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * ms, 4),
+            "p90_ms": round(self.percentile(90) * ms, 4),
+            "p99_ms": round(self.percentile(99) * ms, 4),
+            "max_ms": round(self.max * ms, 4),
+            # [bucket upper bound in ms, count] for every non-empty bucket
+            "buckets": [[round(_BOUNDS_US[b] / 1000, 4), n]
+                        for b, n in enumerate(self.counts) if n],
+        }
+
+
+class Instruments:
+    """Named phase histograms for one session."""
+
+    def __init__(self, overlay: bool = True):
+        """
+        Args:
+            overlay: Whether TypingTest should draw the debug overlay
+        """
+        self.overlay = overlay
+        self.phases: Dict[str, Histogram] = {}
+        self._overlay_line = ""
+        self._overlay_at = 0.0
+
+    def record(self, phase: str, seconds: float):
+        """Count one timed run of a phase."""
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = Histogram()
+        histogram.add(seconds)
+
+    def overlay_line(self) -> str:
+        """One-line p50/p95 summary, refreshed at most every OVERLAY_INTERVAL."""
+        now = time.monotonic()
+        if now - self._overlay_at >= OVERLAY_INTERVAL:
+            self._overlay_at = now
+            parts = []
+            for phase in OVERLAY_PHASES:
+                histogram = self.phases.get(phase)
+                if histogram is not None and histogram.count:
+                    parts.append(f"{phase} {histogram.percentile(50) * 1000:.2f}/"
+                                 f"{histogram.percentile(95) * 1000:.2f}")
+            self._overlay_line = "p50/p95 ms: " + " | ".join(parts) if parts else ""
+        return self._overlay_line
+
+    def summary(self) -> Dict:
+        """Every phase's histogram, plus what kind of terminal this ran on."""
+        return {
+            "phases": {name: h.to_dict() for name, h in sorted(self.phases.items())},
+            "terminal": {
+                "term": os.environ.get("TERM"),
+                "ssh": "SSH_CONNECTION" in os.environ,
+                "tmux": "TMUX" in os.environ,
+            },
+        }
+
+    def dump(self, path: Optional[str]):
+        """Write summary() as JSON to `path` (no-op for None)."""
+        if path:
+            with open(path, "w") as f:
+                json.dump(self.summary(), f, indent=2)
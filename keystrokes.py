@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Keystroke timeline for Monkey-CLI.
+Every keystroke of a test is kept in preallocated typed arrays, so the
+input path stores plain numbers and never allocates per-event objects.
+"""
+
+import base64
+import math
+import struct
+import zlib
+from array import array
+from typing import Dict, Iterator, Tuple
+
+# On-disk record: microseconds since the previous keystroke, key code,
+# text position, correctness flag. Delta-encoded, zlib'ed, then base64'ed.
+RECORD = struct.Struct("<IHIB")
+
+# Keystrokes per window when looking for the fastest burst
+BURST_WINDOW = 10
+
+
+class KeystrokeBuffer:
+    """Growable, array-backed record of (time, key, position, correct) events."""
+
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize the buffer.
+
+        Args:
+            capacity: Number of keystrokes to preallocate room for.
+                The arrays double in place when it is exceeded.
+        """
+        self.count = 0
+        self._times = array("d", bytes(8 * capacity))
+        self._keys = array("H", bytes(2 * capacity))
+        self._positions = array("I", bytes(4 * capacity))
+        self._correct = bytearray(capacity)
+
+    def _grow(self):
+        self._times.extend(self._times)
+        self._keys.extend(self._keys)
+        self._positions.extend(self._positions)
+        self._correct.extend(self._correct)
+
+    def record(self, timestamp: float, key: int, position: int, correct: bool):
+        """
+        Store one keystroke.
+
+        Args:
+            timestamp: time.monotonic() when the key was read
+            key: curses key code
+            position: Index in the target text the key applied to
+            correct: Whether it matched the target character
+        """
+        i = self.count
+        if i == len(self._correct):
+            self._grow()
+        self._times[i] = timestamp
+        self._keys[i] = key & 0xFFFF
+        self._positions[i] = position
+        self._correct[i] = correct
+        self.count = i + 1
+
+    def encode(self) -> str:
+        """Pack the timeline into a compact text blob for storage."""
+        out = bytearray(RECORD.size * self.count)
+        previous = self._times[0] if self.count else 0.0
+        for i in range(self.count):
+            delta = round((self._times[i] - previous) * 1_000_000)
+            previous = self._times[i]
+            RECORD.pack_into(out, i * RECORD.size, min(delta, 0xFFFFFFFF),
+                             self._keys[i], self._positions[i], self._correct[i])
+        return base64.b64encode(zlib.compress(bytes(out), 9)).decode("ascii")
+
+    def summary(self) -> Dict:
+        """
+        Derive per-key figures from the printable keystrokes.
+
+        Returns:
+            Dict with mean key interval (ms), consistency (%) and the
+            fastest WPM over any BURST_WINDOW consecutive keystrokes.
+        """
+        times = [self._times[i] for i in range(self.count) if 32 <= self._keys[i] <= 126]
+        intervals = [b - a for a, b in zip(times, times[1:])]
+        if not intervals:
+            return {"mean_interval_ms": 0.0, "consistency": 0.0, "burst_wpm": 0.0}
+
+        mean = sum(intervals) / len(intervals)
+        stddev = math.sqrt(sum((x - mean) ** 2 for x in intervals) / len(intervals))
+        consistency = max(0.0, 100.0 * (1 - stddev / mean)) if mean > 0 else 0.0
+
+        burst = 0.0
+        window = min(BURST_WINDOW, len(times) - 1)
+        for i in range(len(times) - window):
+            span = times[i + window] - times[i]
+            if span > 0:
+                burst = max(burst, (window / 5) / (span / 60))
+
+        return {"mean_interval_ms": mean * 1000, "consistency": consistency,
+                "burst_wpm": burst}
+
+
+def decode(blob: str) -> Iterator[Tuple[float, int, int, bool]]:
+    """
+    Iterate a stored timeline as (seconds since first key, key, position,
+    correct) without materializing it.
+    """
+    data = zlib.decompress(base64.b64decode(blob))
+    elapsed = 0
+    for delta, key, position, correct in RECORD.iter_unpack(data):
+        elapsed += delta
+        yield elapsed / 1_000_000, key, position, bool(correct)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Word-wrap layout for Monkey-CLI's multi-line text view.
+
+Line start offsets of the target text are computed once per terminal
+width and kept in an array; finding the line under the cursor is then a
+binary search. Text that grows at the end (endless mode) only has its new
+lines broken; the layout is rebuilt from scratch only when the width
+changes, i.e. on KEY_RESIZE.
+"""
+
+from array import array
+from bisect import bisect_right
+from typing import Tuple
+
+
+class Layout:
+    """Start offsets of the word-wrapped lines of a text at one width."""
+
+    def __init__(self, width: int, start: int = 0):
+        """
+        Args:
+            width: Most characters per line; a space ending a line may hang
+                one past it
+            start: Position the first line starts at (the oldest position
+                still held by a WordStream)
+        """
+        self.width = width
+        self.starts = array("Q", [start])
+
+    def extend(self, text):
+        """
+        Break the lines that `text` now fills. Only the last, still open
+        line is looked at again, so calling this every frame is O(1)
+        unless text was added.
+        """
+        width, starts = self.width, self.starts
+        length = len(text)
+        start = starts[-1]
+        while length - start > width:
+            space = text[start:start + width + 1].rfind(" ")
+            # A word longer than a whole line is cut where the line ends
+            start = start + space + 1 if space > 0 else start + width
+            starts.append(start)
+
+    def line_of(self, position: int) -> int:
+        """Index of the line holding `position`."""
+        return max(0, bisect_right(self.starts, position) - 1)
+
+    def bounds(self, line: int, length: int) -> Tuple[int, int]:
+        """(start, end) positions of a line of a text `length` long."""
+        end = self.starts[line + 1] if line + 1 < len(self.starts) else length
+        return self.starts[line], end
+
+    @property
+    def lines(self) -> int:
+        return len(self.starts)
@@ -3,27 +3,175 @@
 Monkey-CLI: A Monkeytype clone for the terminal.
 A minimalistic typing test application with real-time WPM and accuracy tracking.
 """
+import startup
+import sys
+
+if "--startup-report" in sys.argv:
+    startup.enable()
+
 from arguments import get_arguments
-from typing_test import TypingTest
 import curses
 
-def main(stdscr):
-    """Main entry point for the application."""
-    duration,word_count,history,dictionary = get_arguments()
-    while True:
-        test = TypingTest(stdscr,
-                          duration=duration,
-                          word_count=word_count,
-                          show_history=history,
-                          dict_name=dictionary)
-        restart = test.run()
-        if not restart:
-            break
+def main(stdscr, args, race=None):
+    """Main entry point for the application (a single test when racing)."""
+    import random
+    from typing_test import TypingTest
+    from session_cache import SessionCache
+    
+    startup.mark("curses ready")
+    cache = SessionCache(storage_backend=args.storage, fsync=args.fsync,
+                         profile=args.profile)
+    instruments = None
+    if args.instrument or args.instrument_json:
+        from instrumentation import Instruments
+        instruments = Instruments(overlay=args.instrument)
+    rng = random.Random(args.seed)
+    next_words = None
+    try:
+        while True:
+            test = TypingTest(stdscr,
+                              duration=args.duration,
+                              word_count=args.word_count,
+                              show_history=args.history,
+                              show_heatmap=args.heatmap,
+                              dict_name=args.list,
+                              cache=cache,
+                              endless=args.endless,
+                              sampling=args.sampling,
+                              drill=args.drill,
+                              corpus=args.corpus,
+                              word_filter=word_filter(args),
+                              defer_load=True,
+                              race=race,
+                              instruments=instruments,
+                              ghost=args.ghost,
+                              rng=rng,
+                              prefetched=next_words,
+                              passage=args.passage)
+            restart = test.run()
+            if not restart or race is not None:
+                break
+            next_words = test.next_words
+    finally:
+        cache.close()
+        if instruments is not None:
+            instruments.dump(args.instrument_json)
+
+
+def word_filter(args):
+    """The WordFilter selected by the command line flags."""
+    from word_index import WordFilter
+    
+    return WordFilter(args.min_length, args.max_length, args.contains,
+                      args.only, args.no_punctuation)
+
+
+def stats(args) -> int:
+    """Print history analytics (the `stats` subcommand); no curses involved."""
+    from analytics import analyze, render
+    from data_storage import open_storage
+    
+    storage = open_storage(args.storage, profile=args.profile)
+    output = render(analyze(storage.summary_columns(), args.window),
+                    args.format, args.table)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output if output.endswith("\n") else output + "\n")
+    return 0
+
+
+def export_history(args) -> int:
+    """Write the history to an archive (the `export` subcommand)."""
+    from data_storage import open_storage
+    from history_archive import write_archive
+    
+    storage = open_storage(args.storage, profile=args.profile)
+    if args.file == "-":
+        count = write_archive(storage.iter_results(), sys.stdout.buffer,
+                              not args.no_keystrokes)
+    else:
+        with open(args.file, "wb") as f:
+            count = write_archive(storage.iter_results(), f, not args.no_keystrokes)
+    print(f"exported {count} results.", file=sys.stderr)
+    return 0
+
+
+def import_history(args) -> int:
+    """Add an archive's results to the history (the `import` subcommand)."""
+    from data_storage import open_storage
+    from history_archive import import_archive
+    
+    storage = open_storage(args.storage, profile=args.profile)
+    try:
+        if args.file == "-":
+            imported, skipped = import_archive(storage, sys.stdin.buffer)
+        else:
+            with open(args.file, "rb") as f:
+                imported, skipped = import_archive(storage, f)
+    except (OSError, ValueError) as e:
+        print(f"could not import {args.file}: {e}")
+        return 1
+    print(f"imported {imported} results, skipped {skipped} already in the history.")
+    return 0
+
+
+def race(args) -> int:
+    """Host a race (`race --serve`) or join one in the UI."""
+    import getpass
+    from race import DEFAULT_SOCKET, RaceClient, RaceServer
+    
+    path = args.socket or DEFAULT_SOCKET
+    if args.serve:
+        import itertools
+        import random
+        from session_cache import SessionCache
+        
+        cache = SessionCache()
+        rng = random.Random(args.seed)
+        try:
+            if args.passage:
+                text = " ".join(cache.passage(args.passage).passage(rng, args.word_count))
+            else:
+                sampler = cache.sampler(args.list, args.sampling, args.drill, args.corpus,
+                                        word_filter(args))
+                text = " ".join(itertools.islice(sampler.words(rng), args.word_count))
+        finally:
+            cache.close()
+        server = RaceServer(text, args.duration, args.players, path, args.countdown)
+        print(f"waiting for {args.players} racers on {path}")
+        server.run()
+        print(server.report())
+        return 0
+    
+    try:
+        client = RaceClient(path, args.name or getpass.getuser())
+    except OSError as e:
+        print(f"could not join the race at {path}: {e}")
+        return 1
+    try:
+        curses.wrapper(lambda scr:main(scr, args, client))
+    finally:
+        client.close()
+    return 0
 
 
 if __name__ == "__main__":
     try:
-        duration,word_count,history,dictionary = get_arguments() #to catch -h
-        curses.wrapper(lambda scr:main(scr))
+        args = get_arguments() #to catch -h
+        startup.mark("arguments parsed")
+        if args.command == "stats":
+            sys.exit(stats(args))
+        if args.command == "race":
+            sys.exit(race(args))
+        if args.command == "export":
+            sys.exit(export_history(args))
+        if args.command == "import":
+            sys.exit(import_history(args))
+        curses.wrapper(lambda scr:main(scr, args))
     except KeyboardInterrupt:
         print("quit Monkey-CLI.")
+    finally:
+        if "--startup-report" in sys.argv:
+            print(startup.report(), file=sys.stderr)
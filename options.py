@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Choices shared by the command line (arguments.py) and the modules that
+implement them. Importing this costs nothing beyond `re`, so parsing
+arguments does not pull in storage, sampling or analytics code, and the
+two sides cannot drift apart.
+"""
+
+import re
+
+# History storage backends (see data_storage.open_storage)
+BACKENDS = ("jsonl", "sqlite")
+
+# When results are forced to disk:
+#   never    - leave it to the OS
+#   batch    - after every batch the writer saves
+#   interval - at most every result_writer.FSYNC_INTERVAL seconds, and on close
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+# How words are drawn (see sampling.open_sampler)
+SAMPLING_MODES = ("uniform", "zipf", "natural")
+
+# Report tables of `stats` (see analytics.analyze)
+TABLES = ("summary", "rolling", "dictionary", "duration", "mode", "trend")
+
+# Profile names: a single path component that is not hidden
+PROFILE_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]*")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Passage mode for Monkey-CLI (--passage FILE).
+
+Tests are whole sentences of a plain-text corpus (a book, a log dump, ...)
+instead of random words. The corpus is memory-mapped and never read as a
+whole: an index of sentence start offsets is built once, cached in
+dicts/.cache/, and after that starting a test is one random index lookup
+and decoding the few sentences it needs, however large the file is.
+"""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Iterator, List
+
+from word_list import cache_path, map_cache, write_cache
+
+# A sentence ends at . ! or ? (plus closing quotes or brackets) followed by
+# whitespace, or at a blank line
+_BOUNDARY = re.compile(rb"[.!?][\"')\]]*\s+|\n[ \t\r]*\n\s*")
+
+# Longest span indexed as one sentence, in bytes. Text that runs on for
+# longer (a log dump, an unpunctuated paragraph) is split at whitespace in
+# the second half of each span, or hard at the limit if there is none, so
+# no lookup ever decodes more than this.
+MAX_SENTENCE = 4096
+_SPACE = re.compile(rb"\s+")
+
+# Most bytes passage() reads from its start before settling for fewer words
+_SCAN_BYTES = 64 * MAX_SENTENCE
+
+# Index file: magic, version, corpus size, corpus mtime, sentence count
+_MAGIC = b"MKPX"
+_VERSION = 2
+_HEADER = struct.Struct("=4sIQQQ")
+
+# Only printable ASCII can be typed; common typographic characters are
+# spelled the ASCII way, anything else is dropped
+_ASCII = str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+                        "\u2013": "-", "\u2014": "-", "\u2026": "...", "\u00a0": " "})
+
+
+def _split_long(data, end: int, offsets: array):
+    """Add break offsets so the span from offsets[-1] to `end` fits MAX_SENTENCE."""
+    start = offsets[-1]
+    while end - start > MAX_SENTENCE:
+        space = _SPACE.search(data, start + MAX_SENTENCE // 2, start + MAX_SENTENCE)
+        start = space.end() if space is not None else start + MAX_SENTENCE
+        offsets.append(start)
+
+
+def build_index(data) -> array:
+    """Start offset of every sentence in `data`, plus len(data) at the end."""
+    offsets = array("Q", [0])
+    for match in _BOUNDARY.finditer(data):
+        _split_long(data, match.end(), offsets)
+        offsets.append(match.end())
+    _split_long(data, len(data), offsets)
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    return offsets
+
+
+class Passage:
+    """Sentences of a memory-mapped corpus, located through a cached offset index."""
+
+    def __init__(self, path: str, mm: mmap.mmap, offsets, index_mm=None):
+        """
+        Args:
+            path: The corpus file
+            mm: The corpus, mapped read-only
+            offsets: Sentence start offsets into it, with the file size last
+            index_mm: Mapped index file that `offsets` is a view of, if any
+        """
+        self.path = path
+        self._mm = mm
+        self.offsets = offsets
+        self._index_mm = index_mm
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def sentence(self, i: int) -> str:
+        """Sentence `i` as typeable text: ASCII, whitespace collapsed."""
+        raw = self._mm[self.offsets[i]:self.offsets[i + 1]]
+        text = raw.decode("utf-8", "replace").translate(_ASCII)
+        return " ".join(text.encode("ascii", "ignore").decode("ascii").split())
+
+    def words(self, rng) -> Iterator[str]:
+        """Endlessly yield the words of consecutive sentences from a random one on."""
+        i = rng.randrange(len(self))
+        while True:
+            sentence = self.sentence(i)
+            if sentence:
+                yield from sentence.split(" ")
+            i = (i + 1) % len(self)
+
+    def passage(self, rng, word_count: int) -> List[str]:
+        """
+        Words of consecutive whole sentences from a random one on.
+
+        Args:
+            rng: random.Random (or the random module) picking the start
+            word_count: Least words to return; a passage ends with the
+                sentence that reaches it, or is cut there if that one
+                sentence alone is much longer. Fewer are returned if the
+                _SCAN_BYTES after the start hold too little text.
+
+        Returns:
+            The passage as a list of words
+        """
+        i = rng.randrange(len(self))
+        words: List[str] = []
+        scanned = 0
+        for _ in range(len(self)):
+            sentence = self.sentence(i)
+            if sentence:
+                words += sentence.split(" ")
+            scanned += self.offsets[i + 1] - self.offsets[i]
+            if len(words) >= word_count or scanned >= _SCAN_BYTES:
+                break
+            i = (i + 1) % len(self)
+        return words if len(words) <= 2 * word_count else words[:word_count]
+
+    def close(self):
+        if self._index_mm is not None:
+            self.offsets.release()
+            self._index_mm.close()
+            self._index_mm = None
+        self._mm.close()
+
+
+def open_passage(path: str) -> Passage:
+    """
+    Map a corpus and its sentence index, building the index when missing or stale.
+
+    Exits with a message if the file cannot be read or has no text.
+    """
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        st = os.stat(path)
+    except (OSError, ValueError) as e:
+        print(f"cannot use {path} as a passage corpus: {e}")
+        sys.exit(-1)
+
+    key = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]
+    index_path = cache_path(os.path.basename(path), f"passage-{key}")
+    stamp = (st.st_size, st.st_mtime_ns)
+    try:
+        index_mm = map_cache(index_path)
+        magic, version, size, mtime, count = _HEADER.unpack_from(index_mm, 0)
+        if (magic, version, size, mtime) == (_MAGIC, _VERSION) + stamp:
+            offsets = memoryview(index_mm)[_HEADER.size:].cast("Q")[:count + 1]
+            return Passage(path, mm, offsets, index_mm)
+        index_mm.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    offsets = build_index(mm)
+    passage = Passage(path, mm, offsets)
+    if not any(passage.sentence(i) for i in range(min(len(passage), 1000))):
+        print(f"no text to type in {path}.")
+        sys.exit(-1)
+    try:
+        write_cache(index_path, (_HEADER.pack(_MAGIC, _VERSION, *stamp, len(offsets) - 1),
+                                 offsets.tobytes()))
+    except OSError:
+        pass  # read-only checkout: keep the index in memory only
+    return passage
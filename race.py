@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Race mode for Monkey-CLI.
+
+A server process hands one target text to every client that joins over a
+Unix domain socket, starts them all at the same moment and fans out their
+progress. Messages are JSON lines. Clients report their position at most
+every SEND_INTERVAL; the server never relays individual reports. Instead it
+keeps the latest state of each racer and broadcasts one snapshot per
+BROADCAST_INTERVAL, encoded once and written to every client. A client
+whose socket buffer is backed up skips snapshots instead of queueing them.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), f"monkey-cli-race-{os.getuid()}.sock")
+
+# Seconds between state snapshots sent by the server
+BROADCAST_INTERVAL = 0.05
+
+# Least seconds between progress reports sent by a client
+SEND_INTERVAL = 0.05
+
+# Seconds between the last racer joining and the start
+COUNTDOWN = 3.0
+
+# Seconds after the time limit before the server gives up on stragglers
+GRACE = 2.0
+
+# Queued bytes above which a client misses snapshots until it catches up
+_HIGH_WATER = 64 * 1024
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class RaceServer:
+    """Asyncio server for one race."""
+
+    def __init__(self, text: str, duration: int, players: int,
+                 path: str = DEFAULT_SOCKET, countdown: float = COUNTDOWN):
+        """
+        Initialize the server.
+
+        Args:
+            text: Target text every racer types
+            duration: Time limit in seconds
+            players: Racers to wait for before starting
+            path: Unix socket to listen on
+            countdown: Seconds from the last join to the start
+        """
+        self.text = text
+        self.duration = duration
+        self.players = players
+        self.path = path
+        self.countdown = countdown
+        self.start_at: Optional[float] = None
+
+        # id -> {"writer", "name", "pos", "wpm", "accuracy", "done", "left"}
+        self._racers: Dict[int, Dict] = {}
+        self._next_id = 0
+        self._dirty = False
+        self._finished: Optional[asyncio.Event] = None
+        self._handlers = set()
+
+        self.messages_in = 0
+        self.snapshots_out = 0
+        self.snapshots_skipped = 0
+
+    def run(self):
+        """Serve until the race is over."""
+        asyncio.run(self.serve())
+
+    async def serve(self):
+        self._finished = asyncio.Event()
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # left behind by an earlier server
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        try:
+            async with server:
+                broadcaster = asyncio.create_task(self._broadcast())
+                await self._finished.wait()
+                broadcaster.cancel()
+                self._send_all(_encode(self._snapshot()))
+                self._send_all(_encode({"type": "end"}))
+                for racer in self._racers.values():
+                    if not racer["left"]:
+                        try:
+                            await racer["writer"].drain()
+                        except ConnectionError:
+                            pass
+                        racer["writer"].close()
+                # Closed connections end their handlers; let them finish
+                if self._handlers:
+                    await asyncio.wait(self._handlers, timeout=1.0)
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            await self._race(reader, writer)
+        finally:
+            self._handlers.discard(task)
+
+    async def _race(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            hello = json.loads(await reader.readline())
+        except ValueError:
+            writer.close()
+            return
+        if hello.get("type") != "join" or self.start_at is not None:
+            writer.write(_encode({"type": "error", "message": "the race has already started"}))
+            writer.close()
+            return
+
+        racer_id = self._next_id
+        self._next_id += 1
+        racer = self._racers[racer_id] = {
+            "writer": writer, "name": str(hello.get("name") or f"racer {racer_id}")[:16],
+            "pos": 0, "wpm": 0, "accuracy": None, "done": False, "left": False}
+        writer.write(_encode({"type": "welcome", "id": racer_id, "text": self.text,
+                              "duration": self.duration, "players": self.players}))
+        self._send_all(_encode(self._roster()))
+        if len(self._racers) == self.players:
+            self.start_at = time.time() + self.countdown
+            self._send_all(_encode({"type": "start", "at": self.start_at}))
+        self._dirty = True
+
+        try:
+            async for line in reader:
+                message = json.loads(line)
+                self.messages_in += 1
+                if message["type"] in ("progress", "finish"):
+                    racer["pos"] = int(message["pos"])
+                    racer["wpm"] = round(message.get("wpm", 0))
+                if message["type"] == "finish":
+                    racer["accuracy"] = message.get("accuracy")
+                    racer["done"] = True
+                self._dirty = True
+        except (ConnectionError, ValueError, KeyError):
+            pass
+        finally:
+            racer["left"] = True
+            writer.close()
+            if self.start_at is None:
+                # Left before the start: free the slot
+                del self._racers[racer_id]
+                self._send_all(_encode(self._roster()))
+            self._dirty = True
+            self._check_finished()
+
+    def _roster(self) -> Dict:
+        return {"type": "roster", "players": self.players,
+                "names": {str(i): r["name"] for i, r in self._racers.items()}}
+
+    def _snapshot(self) -> Dict:
+        return {"type": "state", "t": time.time(),
+                "racers": [[i, r["pos"], r["wpm"], int(r["done"])]
+                           for i, r in self._racers.items()]}
+
+    def _send_all(self, data: bytes, droppable: bool = False):
+        """Write one encoded message to every connected racer. Droppable
+        messages (snapshots) are skipped for clients that are behind."""
+        for racer in self._racers.values():
+            writer = racer["writer"]
+            if racer["left"] or writer.is_closing():
+                continue
+            if droppable and writer.transport.get_write_buffer_size() > _HIGH_WATER:
+                self.snapshots_skipped += 1
+                continue
+            writer.write(data)
+
+    def _check_finished(self):
+        if self.start_at is None:
+            return
+        overtime = time.time() > self.start_at + self.duration + GRACE
+        if overtime or all(r["done"] or r["left"] for r in self._racers.values()):
+            self._finished.set()
+
+    async def _broadcast(self):
+        while True:
+            await asyncio.sleep(BROADCAST_INTERVAL)
+            if self._dirty:
+                self._dirty = False
+                self._send_all(_encode(self._snapshot()), droppable=True)
+                self.snapshots_out += 1
+            self._check_finished()
+
+    def standings(self) -> List[Dict]:
+        """Racers ordered by finish, then by position."""
+        racers = [dict(name=r["name"], pos=r["pos"], wpm=r["wpm"],
+                       accuracy=r["accuracy"], done=r["done"])
+                  for r in self._racers.values()]
+        return sorted(racers, key=lambda r: (not r["done"], -r["wpm"] if r["done"] else -r["pos"]))
+
+    def report(self) -> str:
+        """Final standings and traffic counters."""
+        lines = []
+        for place, r in enumerate(self.standings(), 1):
+            status = f"{r['wpm']} wpm, {r['accuracy']}%" if r["done"] else f"out at {r['pos']}"
+            lines.append(f"{place:2}. {r['name']:<16} {status}")
+        lines.append(f"messages in: {self.messages_in} | snapshots out: {self.snapshots_out} "
+                     f"| skipped for slow clients: {self.snapshots_skipped}")
+        return "\n".join(lines)
+
+
+class RaceClient:
+    """Connection to a race server; state is updated by a reader thread."""
+
+    def __init__(self, path: str = DEFAULT_SOCKET, name: Optional[str] = None):
+        """
+        Join a race. Blocks until the server has sent the text.
+
+        Args:
+            path: Unix socket of the server
+            name: Name shown to the other racers
+
+        Raises:
+            OSError: If the server cannot be reached or refuses to let us in
+        """
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._file = self._sock.makefile("rb")
+        self._sock.sendall(_encode({"type": "join", "name": name}))
+        welcome = json.loads(self._file.readline() or b"{}")
+        if welcome.get("type") != "welcome":
+            self.close()
+            raise ConnectionRefusedError(welcome.get("message", "no answer from the race server"))
+
+        self.id: int = welcome["id"]
+        self.text: str = welcome["text"]
+        self.duration: int = welcome["duration"]
+        self.players: int = welcome["players"]
+        self.names: Dict[int, str] = {}
+        self.racers: List[Tuple[int, int, int, int]] = []  # (id, pos, wpm, done)
+        self.start_at: Optional[float] = None
+        self.ended = False
+        # Age of each snapshot on arrival, in seconds
+        self.snapshot_delays = array("d")
+
+        self._sent: Tuple[int, int] = (0, 0)
+        self._sent_at = 0.0
+        self._finished = False
+        self._reader = threading.Thread(target=self._read, name="race-reader", daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        try:
+            for line in self._file:
+                message = json.loads(line)
+                kind = message["type"]
+                if kind == "state":
+                    self.racers = [tuple(r) for r in message["racers"]]
+                    self.snapshot_delays.append(time.time() - message["t"])
+                elif kind == "roster":
+                    self.names = {int(i): n for i, n in message["names"].items()}
+                elif kind == "start":
+                    self.start_at = message["at"]
+                elif kind == "end":
+                    break
+        except (OSError, ValueError, KeyError):
+            pass
+        self.ended = True
+
+    def _send(self, message: Dict):
+        try:
+            self._sock.sendall(_encode(message))
+        except OSError:
+            self.ended = True
+
+    def update(self, position: int, wpm: float):
+        """Report progress; sent only if it changed and SEND_INTERVAL has passed."""
+        state = (position, round(wpm))
+        now = time.monotonic()
+        if self.ended or self._finished or state == self._sent or now - self._sent_at < SEND_INTERVAL:
+            return
+        self._sent, self._sent_at = state, now
+        self._send({"type": "progress", "pos": position, "wpm": state[1]})
+
+    def finish(self, position: int, wpm: float, accuracy: float):
+        """Report the final result (once)."""
+        if self._finished or self.ended:
+            return
+        self._finished = True
+        self._send({"type": "finish", "pos": position, "wpm": round(wpm),
+                    "accuracy": round(accuracy, 2)})
+
+    def standings(self) -> List[Tuple[int, str, int, int, bool]]:
+        """(id, name, position, wpm, finished) for every racer, in join order."""
+        return [(i, self.names.get(i, f"racer {i}"), pos, wpm, bool(done))
+                for i, pos, wpm, done in self.racers]
+
+    def close(self):
+        """Leave the race."""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
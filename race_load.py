@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Load test for Monkey-CLI race mode.
+Starts a race server process and many headless clients, each in its own
+process, that type the race text at slightly different speeds. Reports
+how stale opponents' progress was on arrival, per-key latency and bytes
+per frame with every racer's bar on screen, and the server's traffic.
+Exits non-zero when a threshold is exceeded, for use in CI.
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import keys_for_text, run_headless
+from race import RaceClient
+from session_cache import SessionCache
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def run_client(path: str, index: int, rate: float, height: int, data_dir: str) -> dict:
+    """Join the race and type its text at about `rate` keys/s."""
+    client = RaceClient(path, f"bot{index}")
+    cache = SessionCache(storage_file=os.path.join(data_dir, f"bot{index}.jsonl"))
+    speed = rate * random.Random(index).uniform(0.7, 1.3)
+
+    def keys(test):
+        while client.start_at is None and not client.ended:
+            time.sleep(0.01)
+        offset = max(0.0, (client.start_at or 0) - time.time())
+        return [(offset + at, key) for at, key in keys_for_text(test.target_text, speed)]
+
+    try:
+        run = run_headless(keys, height=height, cache=cache, race=client)
+    finally:
+        cache.close()
+        client.close()
+
+    frame_bytes = run["frame_bytes"]
+    return {
+        "wpm": round(run["test"].wpm or 0.0, 1),
+        "snapshots": len(client.snapshot_delays),
+        "snapshot_delays_ms": [d * 1000 for d in client.snapshot_delays],
+        "key_latencies_ms": [x * 1000 for x in run["key_latencies"]],
+        "bytes_per_frame": sum(frame_bytes) / len(frame_bytes) if frame_bytes else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="race_load.py",
+                                     description="Load test for Monkey-CLI race mode.")
+    parser.add_argument("-c", "--clients", type=int, default=16, help="headless racers to spawn.")
+    parser.add_argument("-r", "--rate", type=float, default=8.0, help="mean keystrokes per second per racer.")
+    parser.add_argument("-w", "--word-count", type=int, default=30, help="words in the race text.")
+    parser.add_argument("-l", "--list", default="default", help="dictionary for the race text.")
+    parser.add_argument("--height", type=int, default=60, help="emulated terminal rows (room for every bar).")
+    parser.add_argument("--json", help="also write the report to this file.")
+    parser.add_argument("--max-delay-ms", type=float, help="fail if p95 snapshot delay exceeds this.")
+    parser.add_argument("--max-latency-ms", type=float, help="fail if p95 key latency exceeds this.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, "race.sock")
+        server = subprocess.Popen(
+            [sys.executable, "monkey_cli.py", "-w", str(args.word_count), "-d", "3600",
+             "-l", args.list, "race", "--serve", "-p", str(args.clients),
+             "--countdown", "1", "--socket", path],
+            stdout=subprocess.PIPE, text=True)
+        try:
+            deadline = time.time() + 10
+            while not os.path.exists(path):
+                if server.poll() is not None or time.time() > deadline:
+                    print("race server did not start", file=sys.stderr)
+                    return 1
+                time.sleep(0.05)
+
+            with ProcessPoolExecutor(max_workers=args.clients) as pool:
+                runs = list(pool.map(run_client, [path] * args.clients, range(args.clients),
+                                     [args.rate] * args.clients, [args.height] * args.clients,
+                                     [data_dir] * args.clients))
+            server_output, _ = server.communicate(timeout=30)
+        finally:
+            if server.poll() is None:
+                server.kill()
+
+    delays = [d for run in runs for d in run["snapshot_delays_ms"]]
+    latencies = [x for run in runs for x in run["key_latencies_ms"]]
+    report = {
+        "clients": args.clients,
+        "snapshots_per_client": round(sum(r["snapshots"] for r in runs) / len(runs), 1),
+        "delay_p50_ms": round(_percentile(delays, 50), 3),
+        "delay_p95_ms": round(_percentile(delays, 95), 3),
+        "delay_max_ms": round(max(delays, default=0.0), 3),
+        "latency_p95_ms": round(_percentile(latencies, 95), 3),
+        "bytes_per_frame": round(sum(r["bytes_per_frame"] for r in runs) / len(runs), 1),
+        "mean_wpm": round(sum(r["wpm"] for r in runs) / len(runs), 1),
+    }
+
+    print(server_output.splitlines()[-1] if server_output else "")
+    print("  ".join(f"{c:>20}" for c in report))
+    print("  ".join(f"{v:>20}" for v in report.values()))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    for limit, key in ((args.max_delay_ms, "delay_p95_ms"),
+                       (args.max_latency_ms, "latency_p95_ms")):
+        if limit is not None and report[key] > limit:
+            print(f"{key} {report[key]} > {limit}", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
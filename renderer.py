@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Damage-tracked renderer for Monkey-CLI.
+Draw calls are collected into a frame, compared row by row against the
+previously flushed frame, and only rows that changed are touched.
+"""
+
+import curses
+import time
+from typing import Dict, List, Optional, Tuple
+
+Segment = Tuple[int, str, int]
+
+
+class Renderer:
+    """Collects a frame of text segments and flushes only what changed."""
+
+    def __init__(self, stdscr, term=curses, instruments=None):
+        """
+        Initialize the renderer.
+
+        Args:
+            stdscr: curses window to draw on
+            term: Provider of doupdate(); the curses module or a headless stand-in
+            instruments: Optional instrumentation.Instruments; doupdate() is
+                timed as the "doupdate" phase
+        """
+        self.stdscr = stdscr
+        self.term = term
+        self.instruments = instruments
+        self._front: Dict[int, List[Segment]] = {}
+        self._back: Dict[int, List[Segment]] = {}
+        self._cursor: Optional[Tuple[int, int]] = None
+        self._full_redraw = True
+
+    def begin(self):
+        """Start collecting a new frame."""
+        self._back = {}
+        self._cursor = None
+
+    def put(self, row: int, col: int, text: str, attr: int = 0):
+        """Queue a single segment of text."""
+        if text:
+            self._back.setdefault(row, []).append((col, text, attr))
+
+    def put_runs(self, row: int, col: int, text: str, attrs: List[int]):
+        """Queue text whose characters have per-character attributes,
+        merging runs of equal attributes into single segments."""
+        start = 0
+        for i in range(1, len(text) + 1):
+            if i == len(text) or attrs[i] != attrs[start]:
+                self.put(row, col + start, text[start:i], attrs[start])
+                start = i
+
+    def set_cursor(self, row: int, col: int):
+        """Place the terminal cursor once the frame is flushed."""
+        self._cursor = (row, col)
+
+    def invalidate(self):
+        """Forget the flushed frame, e.g. after a terminal resize."""
+        self._full_redraw = True
+
+    def flush(self):
+        """Write the rows that differ from the last frame and update the terminal."""
+        if self._full_redraw:
+            self.stdscr.erase()
+            self._front = {}
+            self._full_redraw = False
+
+        for row in set(self._front) | set(self._back):
+            segments = self._back.get(row)
+            if segments == self._front.get(row):
+                continue
+            try:
+                self.stdscr.move(row, 0)
+                self.stdscr.clrtoeol()
+            except curses.error:
+                continue
+            for col, text, attr in segments or ():
+                try:
+                    self.stdscr.addstr(row, col, text, attr)
+                except curses.error:
+                    # writing the bottom-right cell raises after drawing
+                    pass
+
+        self._front = self._back
+        if self._cursor is not None:
+            try:
+                self.stdscr.move(*self._cursor)
+            except curses.error:
+                pass
+        self.stdscr.noutrefresh()
+        if self.instruments is None:
+            self.term.doupdate()
+        else:
+            started = time.perf_counter()
+            self.term.doupdate()
+            self.instruments.record("doupdate", time.perf_counter() - started)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Background result persistence for Monkey-CLI.
+Finished tests hand their result to a queue and return immediately; one
+writer thread saves whatever has accumulated as a single batch, so a slow
+disk or a network home directory never stalls the results screen.
+Repeated completion events for the same test are dropped, and everything
+still queued is written when the writer is closed or the program exits.
+A test's key heatmap travels with its result and is merged into the
+stored one once per batch.
+"""
+
+import atexit
+import queue
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from heatmap import Heatmap
+from options import FSYNC_POLICIES
+
+# Seconds between forced syncs under the "interval" policy
+FSYNC_INTERVAL = 5.0
+
+# Most results saved in one batch
+MAX_BATCH = 256
+
+_STOP = object()
+
+
+class ResultWriter:
+    """Single background thread that saves queued results to a storage backend."""
+
+    def __init__(self, storage, fsync: str = "batch", max_batch: int = MAX_BATCH):
+        """
+        Start the writer thread.
+
+        Args:
+            storage: Backend with save_results(results, fsync), sync()
+                and merge_heatmap(heatmap)
+            fsync: One of FSYNC_POLICIES
+            max_batch: Most results to save with one call
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        self.storage = storage
+        self.fsync = fsync
+        self.max_batch = max_batch
+        self.error: Optional[BaseException] = None
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._seen = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Left over from a batch that failed, retried first
+        self._pending_results: List[Dict] = []
+        self._pending_heatmaps: List[Heatmap] = []
+        self._synced_at = time.monotonic()
+        self._unsynced = False
+
+        self._thread = threading.Thread(target=self._run, name="result-writer",
+                                        daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, key: Hashable, result: Dict, heatmap=None) -> bool:
+        """
+        Queue a result for saving.
+
+        Args:
+            key: Identifies the test; a second result with the same key
+                is ignored
+            result: Record to save (see data_storage.build_result)
+            heatmap: The test's Heatmap, merged into the stored one
+
+        Returns:
+            Whether the result was queued
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("result writer is closed")
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+        self._queue.put((result, heatmap))
+        return True
+
+    def flush(self):
+        """Block until every queued result has been handed to the backend."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch, done, stop = [], 1, item is _STOP
+            if not stop:
+                batch.append(item)
+            # Take whatever else is already waiting, without lingering
+            while not stop and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                done += 1
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in range(done):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch: List[Tuple]):
+        """Save a batch (after any earlier failed one) and sync per policy."""
+        self._pending_results += [result for result, _ in batch]
+        self._pending_heatmaps += [heatmap for _, heatmap in batch if heatmap]
+        try:
+            if self._pending_results:
+                self.storage.save_results(self._pending_results,
+                                          fsync=self.fsync == "batch")
+                self._pending_results = []
+                self._unsynced = self.fsync == "interval"
+            if self._pending_heatmaps:
+                total = Heatmap()
+                for heatmap in self._pending_heatmaps:
+                    total.merge(heatmap)
+                self.storage.merge_heatmap(total)
+                self._pending_heatmaps = []
+            if self._unsynced and time.monotonic() - self._synced_at >= FSYNC_INTERVAL:
+                self._sync()
+        except Exception as e:  # keep the thread alive; retried on the next batch
+            self.error = e
+
+    def _sync(self):
+        self.storage.sync()
+        self._synced_at = time.monotonic()
+        self._unsynced = False
+
+    def close(self):
+        """
+        Write everything still queued, sync it and stop the thread.
+
+        Raises:
+            The last storage error if some results could not be saved.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._pending_results or self._pending_heatmaps:
+            raise self.error
+        if self._unsynced:
+            self._sync()
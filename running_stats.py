@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Running statistics for Monkey-CLI.
+A small summary of the whole history that is updated in O(1) per result,
+so the history screen never has to scan the stored results.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+# Percentiles come from fixed-width histograms: 1 WPM wide up to
+# WPM_BUCKETS (the last bucket absorbs anything faster), 1% wide for accuracy.
+WPM_BUCKETS = 400
+ACCURACY_BUCKETS = 101
+
+
+class _Series:
+    """Count, extremes and Welford mean/variance of one measurement."""
+
+    def __init__(self, buckets: int):
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.histogram = [0] * buckets
+
+    def add(self, value: float, count: int):
+        self.sum += value
+        delta = value - self.mean
+        self.mean += delta / count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        bucket = min(len(self.histogram) - 1, max(0, int(value)))
+        self.histogram[bucket] += 1
+
+    def stddev(self, count: int) -> float:
+        return math.sqrt(self.m2 / (count - 1)) if count > 1 else 0.0
+
+    def percentile(self, q: float, count: int) -> float:
+        """Approximate the q-th percentile (0-100) to bucket resolution."""
+        if count == 0:
+            return 0.0
+        rank = q / 100 * count
+        seen = 0
+        for bucket, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank and n:
+                return float(bucket)
+        return float(len(self.histogram) - 1)
+
+    def to_dict(self) -> Dict:
+        return {"sum": self.sum, "mean": self.mean, "m2": self.m2,
+                "min": self.min, "max": self.max, "histogram": self.histogram}
+
+    @classmethod
+    def from_dict(cls, data: Dict, buckets: int) -> "_Series":
+        series = cls(buckets)
+        series.sum = data["sum"]
+        series.mean = data["mean"]
+        series.m2 = data["m2"]
+        series.min = data["min"]
+        series.max = data["max"]
+        if len(data["histogram"]) == buckets:
+            series.histogram = list(data["histogram"])
+        return series
+
+
+class RunningStats:
+    """Summary of every stored result, maintained one result at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_chars = 0
+        self.wpm = _Series(WPM_BUCKETS)
+        self.accuracy = _Series(ACCURACY_BUCKETS)
+
+    @classmethod
+    def from_results(cls, results: List[Dict]) -> "RunningStats":
+        """Build the summary from scratch."""
+        stats = cls()
+        for result in results:
+            stats.update(result)
+        return stats
+
+    def update(self, result: Dict):
+        """Fold one saved result into the summary."""
+        self.count += 1
+        self.total_chars += result["total_chars"]
+        self.wpm.add(result["wpm"], self.count)
+        self.accuracy.add(result["accuracy"], self.count)
+
+    def summary(self) -> Dict:
+        """
+        Get the statistics shown on the history screen.
+
+        Returns:
+            Dict with the same keys as DataStorage.get_statistics, plus
+            spread and percentile figures.
+        """
+        n = self.count
+        return {
+            "total_tests": n,
+            "average_wpm": round(self.wpm.mean, 2),
+            "average_accuracy": round(self.accuracy.mean, 2),
+            "best_wpm": round(self.wpm.max or 0.0, 2),
+            "best_accuracy": round(self.accuracy.max or 0.0, 2),
+            "total_chars": self.total_chars,
+            "worst_wpm": round(self.wpm.min or 0.0, 2),
+            "wpm_stddev": round(self.wpm.stddev(n), 2),
+            "accuracy_stddev": round(self.accuracy.stddev(n), 2),
+            "median_wpm": self.wpm.percentile(50, n),
+            "p90_wpm": self.wpm.percentile(90, n),
+        }
+
+    def to_dict(self) -> Dict:
+        return {"count": self.count, "total_chars": self.total_chars,
+                "wpm": self.wpm.to_dict(), "accuracy": self.accuracy.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RunningStats":
+        stats = cls()
+        stats.count = data["count"]
+        stats.total_chars = data["total_chars"]
+        stats.wpm = _Series.from_dict(data["wpm"], WPM_BUCKETS)
+        stats.accuracy = _Series.from_dict(data["accuracy"], ACCURACY_BUCKETS)
+        return stats
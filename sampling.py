@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Word sampling engine for Monkey-CLI.
+
+Besides uniform draws, words can be drawn by rank-based Zipf weight
+(the bundled lists are frequency ordered), with extra weight on words
+containing drill keys, or as bigram chains learned from a text corpus.
+Weighted draws use Walker alias tables and bigram draws use cumulative
+successor arrays; both are built once and cached next to the compiled
+dictionary in dicts/.cache/, so sampling stays O(1) (O(log k) for
+bigrams) on 180k-word lists.
+"""
+
+import hashlib
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from options import SAMPLING_MODES
+from word_list import cache_path, map_cache, source_stamp, write_cache
+
+# Exponent of the rank-based Zipf weights: weight(rank) = 1 / rank ** s
+ZIPF_EXPONENT = 1.0
+
+# Share of drawn words that contain a drill key. Words containing one are
+# reweighted to reach it whatever their share of the list; among them,
+# more occurrences weigh more
+DRILL_SHARE = 0.6
+
+# Alias table file: magic, version, source size, source mtime, count, padding
+_ALIAS_MAGIC = b"MKAL"
+_ALIAS_HEADER = struct.Struct("=4sIQQI4x")
+# Bigram file: magic, version, dict size, dict mtime, corpus size,
+# corpus mtime, word count, pair count
+_BIGRAM_MAGIC = b"MKBG"
+_BIGRAM_HEADER = struct.Struct("=4sIQQQQII")
+_VERSION = 2
+
+_TOKEN = re.compile(r"[A-Za-z']+")
+
+
+def build_alias(weights: Sequence[float]) -> Tuple[array, array]:
+    """
+    Build a Walker alias table in O(n).
+
+    Returns:
+        (prob, alias): draw i uniformly, keep it with probability prob[i],
+        otherwise take alias[i].
+    """
+    n = len(weights)
+    total = float(sum(weights))
+    prob = array("d", (w * n / total for w in weights))
+    alias = array("I", range(n))
+    small = [i for i in range(n) if prob[i] < 1.0]
+    large = [i for i in range(n) if prob[i] >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        alias[s] = l
+        prob[l] -= 1.0 - prob[s]
+        (small if prob[l] < 1.0 else large).append(l)
+    for i in small + large:
+        prob[i] = 1.0
+    return prob, alias
+
+
+class UniformSampler:
+    """Every word equally likely."""
+
+    def __init__(self, word_list):
+        self.word_list = word_list
+
+    def draw(self, rng) -> int:
+        return rng.randrange(len(self.word_list))
+
+    def words(self, rng) -> Iterator[str]:
+        """Endlessly yield sampled words."""
+        word_list = self.word_list
+        while True:
+            yield word_list[self.draw(rng)]
+
+
+class AliasSampler(UniformSampler):
+    """Weighted draws in O(1) from a Walker alias table."""
+
+    def __init__(self, word_list, prob, alias):
+        super().__init__(word_list)
+        self.prob = prob
+        self.alias = alias
+
+    def draw(self, rng) -> int:
+        i = rng.randrange(len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class BigramSampler(UniformSampler):
+    """
+    Markov chain over word bigrams: each word's successors are stored
+    contiguously with cumulative counts, and a draw is one bisect.
+    Words with no known successor restart from the base sampler.
+    """
+
+    def __init__(self, word_list, base: UniformSampler, offsets, successors, cumulative):
+        super().__init__(word_list)
+        self.base = base
+        self.offsets = offsets
+        self.successors = successors
+        self.cumulative = cumulative
+        self.previous: Optional[int] = None
+
+    def draw(self, rng) -> int:
+        prev = self.previous
+        if prev is not None:
+            lo, hi = self.offsets[prev], self.offsets[prev + 1]
+            if hi > lo:
+                start = self.cumulative[lo - 1] if lo else 0
+                r = start + rng.randrange(self.cumulative[hi - 1] - start)
+                self.previous = self.successors[bisect_right(self.cumulative, r, lo, hi)]
+                return self.previous
+        self.previous = self.base.draw(rng)
+        return self.previous
+
+
+def _zipf_weights(n: int) -> Iterator[float]:
+    return (1.0 / (rank + 1) ** ZIPF_EXPONENT for rank in range(n))
+
+
+def _drill_weights(word_list, keys: str, zipf: bool) -> List[float]:
+    keys = set(keys.lower())
+    base = _zipf_weights(len(word_list)) if zipf else iter(lambda: 1.0, None)
+    weights, hits = [], []
+    for word, weight in zip(word_list, base):
+        weights.append(weight)
+        hits.append(sum(1 for ch in word.lower() if ch in keys))
+    drilled = sum(w * h for w, h in zip(weights, hits))
+    other = sum(w for w, h in zip(weights, hits) if not h)
+    if not drilled or not other:
+        return weights  # nothing (or everything) to favour
+    scale = DRILL_SHARE / (1.0 - DRILL_SHARE) * other / drilled
+    return [w * h * scale if h else w for w, h in zip(weights, hits)]
+
+
+def _alias_table(name: str, suffix: str, word_list, weights, persist: bool = True):
+    """
+    Load a cached alias table, rebuilding it when dicts/<name> changed.
+    With persist=False the table is only built in memory.
+    """
+    if not persist:
+        return build_alias(list(weights()))
+    path = cache_path(name, suffix)
+    stamp = source_stamp(name)
+    n = len(word_list)
+    try:
+        mm = map_cache(path)
+        magic, version, size, mtime, count = _ALIAS_HEADER.unpack_from(mm, 0)
+        if (magic, version, size, mtime, count) == (_ALIAS_MAGIC, _VERSION) + stamp + (n,):
+            view = memoryview(mm)
+            start = _ALIAS_HEADER.size
+            prob = view[start:start + 8 * n].cast("d")
+            alias = view[start + 8 * n:start + 12 * n].cast("I")
+            return prob, alias
+        mm.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    prob, alias = build_alias(list(weights()))
+    try:
+        write_cache(path, (_ALIAS_HEADER.pack(_ALIAS_MAGIC, _VERSION, *stamp, n),
+                             prob.tobytes(), alias.tobytes()))
+    except OSError:
+        pass  # read-only checkout: keep the table in memory only
+    return prob, alias
+
+
+def _build_bigrams(word_list, corpus: str):
+    """Count word bigrams of a corpus, restricted to the dictionary."""
+    index = {}
+    for i, word in enumerate(word_list):
+        index.setdefault(word, i)
+    pairs = Counter()
+    prev = None
+    with open(corpus, "r", errors="replace") as f:
+        for line in f:
+            for token in _TOKEN.findall(line):
+                cur = index.get(token, index.get(token.lower()))
+                if cur is not None and prev is not None:
+                    pairs[prev, cur] += 1
+                prev = cur
+
+    offsets = array("I", bytes(4 * (len(word_list) + 1)))
+    successors, cumulative = array("I"), array("I")
+    running = 0
+    row = 0
+    for (a, b), count in sorted(pairs.items()):
+        while row < a:
+            row += 1
+            offsets[row] = len(successors)
+        successors.append(b)
+        running += count
+        cumulative.append(running)
+    while row < len(word_list):
+        row += 1
+        offsets[row] = len(successors)
+    return offsets, successors, cumulative
+
+
+def _bigram_table(name: str, word_list, corpus: str, variant: str = ""):
+    """Load cached bigram arrays, rebuilding them when either file changed."""
+    key = hashlib.sha1(os.path.abspath(corpus).encode()).hexdigest()[:12]
+    path = cache_path(name, f"{variant}bigram-{key}")
+    st = os.stat(corpus)
+    stamp = source_stamp(name) + (st.st_size, st.st_mtime_ns)
+    n = len(word_list)
+    try:
+        mm = map_cache(path)
+        magic, version, *found, count, pairs = _BIGRAM_HEADER.unpack_from(mm, 0)
+        if (magic, version, tuple(found), count) == (_BIGRAM_MAGIC, _VERSION, stamp, n):
+            view = memoryview(mm)
+            start = _BIGRAM_HEADER.size
+            offsets = view[start:start + 4 * (n + 1)].cast("I")
+            start += 4 * (n + 1)
+            successors = view[start:start + 4 * pairs].cast("I")
+            cumulative = view[start + 4 * pairs:start + 8 * pairs].cast("I")
+            return offsets, successors, cumulative
+        mm.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    offsets, successors, cumulative = _build_bigrams(word_list, corpus)
+    try:
+        write_cache(path, (_BIGRAM_HEADER.pack(_BIGRAM_MAGIC, _VERSION, *stamp, n,
+                                                 len(successors)),
+                             offsets.tobytes(), successors.tobytes(),
+                             cumulative.tobytes()))
+    except OSError:
+        pass
+    return offsets, successors, cumulative
+
+
+def open_sampler(name: str, word_list, mode: str = "uniform",
+                 drill: Optional[str] = None, corpus: Optional[str] = None,
+                 variant: str = "", cache_drill: bool = True):
+    """
+    Create the sampler for a dictionary.
+
+    Args:
+        name: Dictionary name (for cache files)
+        word_list: The loaded dictionary
+        mode: "uniform", "zipf" (rank-weighted) or "natural" (bigram
+            chains from `corpus`, Zipf-weighted restarts)
+        drill: Keys to practice; words containing them are favoured
+        corpus: Plain-text file the bigrams are learned from
+        variant: Prefix for cache files when `word_list` is a filtered
+            view of the dictionary (see word_index.FilteredWordList)
+        cache_drill: Keep the drill table in dicts/.cache/. Off for keys
+            picked by --drill auto, which change with the heatmap and would
+            leave a table behind for every set
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"unknown sampling mode: {mode}")
+    zipf = mode != "uniform"
+
+    if drill:
+        keys = "".join(sorted(set(drill.lower())))
+        suffix = f"{variant}drill-{'zipf' if zipf else 'flat'}-{keys.encode().hex()}"
+        base = AliasSampler(word_list, *_alias_table(
+            name, suffix, word_list, lambda: _drill_weights(word_list, keys, zipf),
+            cache_drill))
+    elif zipf:
+        base = AliasSampler(word_list, *_alias_table(
+            name, f"{variant}zipf", word_list, lambda: _zipf_weights(len(word_list))))
+    else:
+        base = UniformSampler(word_list)
+
+    if mode == "natural":
+        if not corpus:
+            raise ValueError("natural sampling needs a corpus file")
+        return BigramSampler(word_list, base, *_bigram_table(name, word_list, corpus, variant))
+    return base
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Session-level resource cache for Monkey-CLI.
+Keeps loaded word lists, passage corpora, the storage backend and its
+background result writer alive across test restarts.
+Backends and dictionaries are imported on first use so that creating the
+cache costs nothing before the first frame is drawn.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+
+
+class SessionCache:
+    """Hands the same loaded resources to every TypingTest in one session."""
+
+    def __init__(self, max_word_lists: int = 4, storage_backend: str = "jsonl",
+                 storage_file: Optional[str] = None, fsync: str = "batch",
+                 profile: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_word_lists: How many word lists to keep loaded at once.
+                The least recently used one is closed when the bound is hit.
+            storage_backend: Name of the history backend (see open_storage)
+            storage_file: Path of the history file. If None, uses default location.
+            fsync: When the result writer forces saved results to disk
+                (see result_writer.FSYNC_POLICIES)
+            profile: Profile whose history is used (see data_storage.data_dir)
+        """
+        self.max_word_lists = max_word_lists
+        self.storage_backend = storage_backend
+        self.storage_file = storage_file
+        self.fsync = fsync
+        self.profile = profile
+        self._word_lists = OrderedDict()
+        self._samplers = {}
+        self._filtered = {}
+        self._passages = {}
+        self._best_runs = {}
+        self._storage = None
+        self._writer = None
+
+    def word_list(self, name: str):
+        """Get a loaded word list, loading it on first use."""
+        if name in self._word_lists:
+            self._word_lists.move_to_end(name)
+            return self._word_lists[name]
+
+        from word_list import load_word_list
+        
+        words = load_word_list(name)
+        self._word_lists[name] = words
+        while len(self._word_lists) > self.max_word_lists:
+            evicted_name, evicted = self._word_lists.popitem(last=False)
+            self._samplers = {k: v for k, v in self._samplers.items()
+                              if k[0] != evicted_name}
+            for key in [k for k in self._filtered if k[0] == evicted_name]:
+                self._filtered.pop(key).close()
+            if hasattr(evicted, "close"):
+                evicted.close()
+        return words
+
+    def filtered(self, name: str, word_filter):
+        """Get the words of a dictionary that pass a WordFilter."""
+        words = self.word_list(name)
+        key = (name, word_filter.key())
+        if key not in self._filtered:
+            from word_index import filter_word_list
+            
+            self._filtered[key] = filter_word_list(name, words, word_filter)
+        return self._filtered[key]
+
+    def sampler(self, name: str, mode: str = "uniform",
+                drill: Optional[str] = None, corpus: Optional[str] = None,
+                word_filter=None, cache_drill: bool = True):
+        """
+        Get a word sampler for a dictionary (optionally filtered), building
+        it on first use (see sampling.open_sampler for cache_drill).
+        """
+        filter_key = word_filter.key() if word_filter else None
+        key = (name, mode, drill, corpus, filter_key)
+        if key not in self._samplers:
+            from sampling import open_sampler
+            
+            if word_filter:
+                words = self.filtered(name, word_filter)
+                variant = f"filter-{filter_key}."
+            else:
+                words, variant = self.word_list(name), ""
+            self._samplers[key] = open_sampler(name, words, mode, drill, corpus, variant,
+                                               cache_drill)
+        else:
+            self.word_list(name)  # keep the dictionary recently used
+        return self._samplers[key]
+
+    def passage(self, path: str):
+        """Get a mapped passage corpus, opening it on first use."""
+        if path not in self._passages:
+            from passage import open_passage
+            
+            self._passages[path] = open_passage(path)
+        return self._passages[path]
+
+    def best_run(self, dictionary: Optional[str], mode: Optional[str],
+                 duration: Optional[int]) -> Optional[dict]:
+        """
+        Get the fastest stored run with a keystroke timeline (see
+        get_best_result), reading the history only the first time.
+        """
+        key = (dictionary, mode, duration)
+        if key not in self._best_runs:
+            self.writer().flush()  # include results still in the queue
+            self._best_runs[key] = self.storage().get_best_result(dictionary, mode, duration)
+        return self._best_runs[key]
+
+    def knows_best_run(self, dictionary: Optional[str], mode: Optional[str],
+                       duration: Optional[int]) -> bool:
+        """Whether best_run would answer without reading the history."""
+        return (dictionary, mode, duration) in self._best_runs
+
+    def record_run(self, result: dict):
+        """Keep best_run current with a result handed to the writer."""
+        key = (result["dictionary"], result["mode"], result["duration"])
+        if key in self._best_runs and result.get("keystrokes"):
+            best = self._best_runs[key]
+            if best is None or result["wpm"] > best["wpm"]:
+                self._best_runs[key] = result
+
+    def storage(self):
+        """Get the shared storage backend, creating it on first use."""
+        if self._storage is None:
+            from data_storage import open_storage
+            
+            self._storage = open_storage(self.storage_backend, self.storage_file, self.profile)
+        return self._storage
+
+    def writer(self):
+        """Get the background result writer, starting it on first use."""
+        if self._writer is None:
+            from result_writer import ResultWriter
+            
+            self._writer = ResultWriter(self.storage(), self.fsync)
+        return self._writer
+
+    def close(self):
+        """Release every cached resource, writing out queued results first."""
+        writer, self._writer = self._writer, None
+        try:
+            if writer is not None:
+                writer.close()
+        finally:
+            for words in self._filtered.values():
+                words.close()
+            self._filtered.clear()
+            for passage in self._passages.values():
+                passage.close()
+            self._passages.clear()
+            for words in self._word_lists.values():
+                if hasattr(words, "close"):
+                    words.close()
+            self._word_lists.clear()
+            self._samplers.clear()
+            self._best_runs.clear()
+            if hasattr(self._storage, "close"):
+                self._storage.close()
+            self._storage = None
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+SQLite storage backend for Monkey-CLI.
+Same interface as DataStorage, with aggregates and "last N" queries
+answered by indexed SQL instead of scanning the whole history.
+The unfiltered summary is a RunningStats record kept in the database,
+next to the per-key heatmap blob. Updates to either run in an immediate
+transaction, which takes SQLite's write lock (an fcntl lock on the
+database) before reading, so processes sharing a history never update
+them from a stale copy.
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Iterator, Optional, Tuple
+
+from data_storage import SUMMARY_FIELDS, build_result, data_dir
+from heatmap import Heatmap
+from running_stats import RunningStats
+
+_COLUMNS = ("timestamp", "wpm", "accuracy", "correct_chars", "incorrect_chars",
+            "total_chars", "duration", "dictionary", "mode", "keystrokes")
+
+# Seconds to wait for another process's write transaction to finish
+_BUSY_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id              INTEGER PRIMARY KEY,
+    timestamp       TEXT    NOT NULL,
+    wpm             REAL    NOT NULL,
+    accuracy        REAL    NOT NULL,
+    correct_chars   INTEGER NOT NULL,
+    incorrect_chars INTEGER NOT NULL,
+    total_chars     INTEGER NOT NULL,
+    duration        INTEGER NOT NULL,
+    dictionary      TEXT,
+    mode            TEXT,
+    keystrokes      TEXT
+);
+CREATE INDEX IF NOT EXISTS results_timestamp  ON results (timestamp);
+CREATE INDEX IF NOT EXISTS results_dictionary ON results (dictionary, timestamp);
+CREATE INDEX IF NOT EXISTS results_mode       ON results (mode, timestamp);
+CREATE INDEX IF NOT EXISTS results_duration   ON results (duration, timestamp);
+CREATE TABLE IF NOT EXISTS summary (
+    id   INTEGER PRIMARY KEY CHECK (id = 0),
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS heatmap (
+    id   INTEGER PRIMARY KEY CHECK (id = 0),
+    data BLOB NOT NULL
+);
+"""
+
+
+class SQLiteStorage:
+    """Manages storage and retrieval of typing test results in SQLite."""
+
+    def __init__(self, data_file: Optional[str] = None, profile: Optional[str] = None):
+        """
+        Initialize SQLite storage.
+
+        Args:
+            data_file: Path to the database. If None, uses the profile's
+                default location.
+            profile: Profile whose history to use (see data_storage.data_dir)
+        """
+        if data_file is None:
+            self.data_file = data_dir(profile) / "history.db"
+        else:
+            self.data_file = Path(data_file)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.data_file), timeout=_BUSY_TIMEOUT,
+                                   check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._migrate()
+        self._stats = self._load_stats()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created."""
+        existing = {r[1] for r in self._db.execute("PRAGMA table_info(results)")}
+        with self._db:
+            for column in _COLUMNS:
+                if column not in existing:
+                    self._db.execute(f"ALTER TABLE results ADD COLUMN {column}")
+
+    def _load_stats(self) -> RunningStats:
+        """Load the running summary, rebuilding it if it disagrees with the table."""
+        with self._lock, self._db:
+            # Checked and rebuilt in one write transaction, so no other
+            # process can add a result in between
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute("SELECT data FROM summary WHERE id = 0").fetchone()
+            count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if row is not None:
+                stats = RunningStats.from_dict(json.loads(row[0]))
+                if stats.count == count:
+                    return stats
+            stats = RunningStats.from_results(
+                dict(r) for r in self._db.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM results ORDER BY timestamp, id"))
+            self._write_stats(stats)
+        return stats
+
+    def _read_stats(self) -> RunningStats:
+        """The stored summary, as last written by any process (lock held)."""
+        row = self._db.execute("SELECT data FROM summary WHERE id = 0").fetchone()
+        return RunningStats.from_dict(json.loads(row[0])) if row is not None else RunningStats()
+
+    def _write_stats(self, stats: RunningStats):
+        self._db.execute("INSERT OR REPLACE INTO summary (id, data) VALUES (0, ?)",
+                         (json.dumps(stats.to_dict()),))
+
+    @staticmethod
+    def _where(dictionary: Optional[str], mode: Optional[str],
+               duration: Optional[int]) -> Tuple[str, list]:
+        """Build a WHERE clause for the optional filters."""
+        clauses, params = [], []
+        for column, value in (("dictionary", dictionary), ("mode", mode),
+                              ("duration", duration)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def save_result(self, wpm: float, accuracy: float,
+                    correct_chars: int, incorrect_chars: int,
+                    total_chars: int, duration: int,
+                    dictionary: Optional[str] = None, mode: Optional[str] = None,
+                    keystrokes: Optional[str] = None):
+        """
+        Save a typing test result.
+
+        Args:
+            wpm: Words per minute
+            accuracy: Accuracy percentage
+            correct_chars: Number of correct characters
+            incorrect_chars: Number of incorrect characters
+            total_chars: Total characters typed
+            duration: Test duration in seconds
+            dictionary: Word list the test was generated from
+            mode: Kind of test that was run
+            keystrokes: Encoded keystroke timeline (see keystrokes.py)
+        """
+        self.save_results([build_result(wpm, accuracy, correct_chars, incorrect_chars,
+                                        total_chars, duration, dictionary, mode,
+                                        keystrokes)])
+
+    def save_results(self, results: List[Dict], fsync: bool = False):
+        """
+        Insert several results (see build_result) in one transaction.
+
+        Args:
+            results: Records to save, oldest first
+            fsync: Checkpoint them into the database file before returning
+        """
+        if not results:
+            return
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.executemany(
+                f"INSERT INTO results ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [tuple(r.get(c) for c in _COLUMNS) for r in results])
+            self._stats = self._read_stats()
+            for result in results:
+                self._stats.update(result)
+            self._write_stats(self._stats)
+        if fsync:
+            self.sync()
+
+    def merge_results(self, results: List[Dict]):
+        """
+        Add results from elsewhere (an import). Queries order by
+        timestamp, so unlike the JSON Lines log they need no merging.
+        """
+        self.save_results(results)
+
+    def sync(self):
+        """Checkpoint the write-ahead log, which syncs it and the database."""
+        with self._lock:
+            self._db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def get_all_results(self) -> List[Dict]:
+        """Get all stored results."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM results ORDER BY timestamp, id").fetchall()
+        return [dict(r) for r in rows]
+
+    def iter_results(self) -> Iterator[Dict]:
+        """Stream stored results oldest first without keeping them in memory."""
+        # Separate connection so a long read never holds the shared lock
+        db = sqlite3.connect(str(self.data_file))
+        db.row_factory = sqlite3.Row
+        try:
+            for row in db.execute(f"SELECT {', '.join(_COLUMNS)} FROM results "
+                                  "ORDER BY timestamp, id"):
+                yield dict(row)
+        finally:
+            db.close()
+
+    def iter_summaries(self) -> Iterator[Dict]:
+        """Stream stored results oldest first without their keystroke timelines."""
+        db = sqlite3.connect(str(self.data_file))
+        db.row_factory = sqlite3.Row
+        try:
+            for row in db.execute(f"SELECT {', '.join(_COLUMNS[:-1])} FROM results "
+                                  "ORDER BY timestamp, id"):
+                yield dict(row)
+        finally:
+            db.close()
+
+    def summary_columns(self) -> Dict[str, list]:
+        """Every stored result without its timeline, as one list per field, oldest first."""
+        db = sqlite3.connect(str(self.data_file))
+        try:
+            rows = db.execute(f"SELECT {', '.join(SUMMARY_FIELDS)} FROM results "
+                              "ORDER BY timestamp, id").fetchall()
+        finally:
+            db.close()
+        fields = list(zip(*rows)) or [()] * len(SUMMARY_FIELDS)
+        return {field: list(values) for field, values in zip(SUMMARY_FIELDS, fields)}
+
+    def get_recent_results(self, count: int = 10, dictionary: Optional[str] = None,
+                           mode: Optional[str] = None,
+                           duration: Optional[int] = None) -> List[Dict]:
+        """Get the most recent N results, optionally filtered."""
+        where, params = self._where(dictionary, mode, duration)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM results{where} "
+                f"ORDER BY timestamp DESC, id DESC LIMIT ?", params + [count]).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def get_statistics(self, dictionary: Optional[str] = None,
+                       mode: Optional[str] = None,
+                       duration: Optional[int] = None) -> Dict:
+        """
+        Get overall statistics, optionally filtered.
+
+        Returns:
+            Dict with average WPM, accuracy, best WPM, total tests, etc.
+            Unfiltered statistics come from the running summary and also
+            include spread and percentile figures.
+        """
+        if dictionary is None and mode is None and duration is None:
+            with self._lock:
+                self._stats = self._read_stats()
+            return self._stats.summary()
+
+        where, params = self._where(dictionary, mode, duration)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*), AVG(wpm), AVG(accuracy), MAX(wpm), MAX(accuracy), "
+                f"SUM(total_chars) FROM results{where}", params).fetchone()
+        total, avg_wpm, avg_acc, best_wpm, best_acc, chars = row
+        return {
+            "total_tests": total,
+            "average_wpm": round(avg_wpm or 0.0, 2),
+            "average_accuracy": round(avg_acc or 0.0, 2),
+            "best_wpm": round(best_wpm or 0.0, 2),
+            "best_accuracy": round(best_acc or 0.0, 2),
+            "total_chars": chars or 0
+        }
+
+    def get_best_result(self, dictionary: Optional[str] = None,
+                        mode: Optional[str] = None,
+                        duration: Optional[int] = None) -> Optional[Dict]:
+        """Get the highest-WPM result that has a keystroke timeline, optionally filtered."""
+        where, params = self._where(dictionary, mode, duration)
+        where += " AND keystrokes IS NOT NULL" if where else " WHERE keystrokes IS NOT NULL"
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM results{where} "
+                "ORDER BY wpm DESC, id LIMIT 1", params).fetchone()
+        return dict(row) if row is not None else None
+
+    def get_heatmap(self) -> Heatmap:
+        """Get the accumulated per-key heatmap."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM heatmap WHERE id = 0").fetchone()
+        return Heatmap.from_bytes(row[0]) if row is not None else Heatmap()
+
+    def merge_heatmap(self, heatmap: Heatmap):
+        """Add one or more tests' heatmap counters to the stored heatmap."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            row = self._db.execute("SELECT data FROM heatmap WHERE id = 0").fetchone()
+            total = Heatmap.from_bytes(row[0]) if row is not None else Heatmap()
+            total.merge(heatmap)
+            self._db.execute("INSERT OR REPLACE INTO heatmap (id, data) VALUES (0, ?)",
+                             (total.to_bytes(),))
+
+    def clear_history(self):
+        """Clear all stored results and the heatmap."""
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM results")
+            self._db.execute("DELETE FROM heatmap")
+            self._stats = RunningStats()
+            self._write_stats(self._stats)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
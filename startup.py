@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Startup timing for Monkey-CLI (--startup-report).
+Records milestones since launch and, like `python -X importtime`,
+how long each module took to import, so time-to-first-frame can be
+measured and kept small. Costs nothing unless enabled.
+"""
+
+import builtins
+import sys
+import time
+
+_started = time.perf_counter()
+_enabled = False
+_marks = []
+_imports = {}
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    began = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        # Inclusive of nested imports, as in the "cumulative" column
+        _imports.setdefault(name, time.perf_counter() - began)
+
+
+def enable():
+    """Start recording milestones and timing first-time imports."""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        builtins.__import__ = _timed_import
+        mark("startup report enabled")
+
+
+def mark(label: str):
+    """Record a milestone once (later calls with the same label are ignored)."""
+    if _enabled and all(label != seen for seen, _ in _marks):
+        _marks.append((label, time.perf_counter() - _started))
+
+
+def report(top: int = 15) -> str:
+    """Format milestones and the slowest imports."""
+    lines = ["startup timeline (ms since launch):"]
+    for label, at in _marks:
+        lines.append(f"  {at * 1000:9.2f}  {label}")
+    lines.append(f"slowest imports (cumulative ms, top {top}):")
+    for name, took in sorted(_imports.items(), key=lambda kv: -kv[1])[:top]:
+        lines.append(f"  {took * 1000:9.2f}  {name}")
+    return "\n".join(lines)
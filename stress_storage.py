@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Concurrent-writer stress test for Monkey-CLI's history storage.
+Many processes share one history and save results (and heatmaps) at the
+same moment, one result or one batch at a time, while another process
+compacts the log. Afterwards every result must be there exactly once and
+parse cleanly, and the running summary and the heatmap must account for
+all of them. Exits non-zero on any lost, duplicated or corrupted record,
+for use in CI.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from data_storage import build_result, open_storage
+from heatmap import Heatmap
+
+
+def _result(writer: int, seq: int, rng: random.Random):
+    result = build_result(wpm=rng.uniform(20, 120), accuracy=rng.uniform(80, 100),
+                          correct_chars=100, incorrect_chars=0, total_chars=100,
+                          duration=30, dictionary="stress", mode="standard",
+                          keystrokes="x" * rng.randrange(0, 4096))
+    # Tag the record so every one can be told apart afterwards
+    result["mode"] = f"w{writer}:{seq}"
+    return result
+
+
+def run_writer(backend: str, path: str, writer: int, count: int, batch: int,
+               start_at: float) -> float:
+    """Save `count` results in batches of up to `batch`; returns seconds spent."""
+    rng = random.Random(writer)
+    storage = open_storage(backend, path)
+    heatmap = Heatmap()
+    heatmap.record("a", "b", True, 0.1)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    seq = 0
+    while seq < count:
+        n = min(batch, count - seq)
+        storage.save_results([_result(writer, seq + i, rng) for i in range(n)],
+                             fsync=rng.random() < 0.1)
+        storage.merge_heatmap(heatmap)
+        seq += n
+    elapsed = time.perf_counter() - started
+    if hasattr(storage, "close"):
+        storage.close()
+    return elapsed
+
+
+def run_compactor(path: str, start_at: float, seconds: float) -> int:
+    """Compact the JSON Lines log over and over while the writers run."""
+    storage = open_storage("jsonl", path)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    compactions = 0
+    while time.time() < start_at + seconds:
+        storage.compact()
+        compactions += 1
+        time.sleep(0.005)
+    return compactions
+
+
+def check(backend: str, path: str, writers: int, count: int, batch: int) -> list:
+    """List every problem found in the history."""
+    problems = []
+    if backend == "jsonl":
+        with open(path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    json.loads(line)
+                except ValueError:
+                    problems.append(f"line {number} is corrupted")
+    storage = open_storage(backend, path)
+    seen = {}
+    for result in storage.iter_results():
+        seen[result["mode"]] = seen.get(result["mode"], 0) + 1
+    expected = {f"w{w}:{s}" for w in range(writers) for s in range(count)}
+    lost = expected - set(seen)
+    duplicated = [tag for tag, n in seen.items() if n > 1]
+    unknown = set(seen) - expected
+    if lost:
+        problems.append(f"{len(lost)} results lost, e.g. {sorted(lost)[:3]}")
+    if duplicated:
+        problems.append(f"{len(duplicated)} results saved twice, e.g. {duplicated[:3]}")
+    if unknown:
+        problems.append(f"{len(unknown)} unexpected results")
+    total = storage.get_statistics()["total_tests"]
+    if total != writers * count:
+        problems.append(f"summary counts {total} tests, expected {writers * count}")
+    attempts = storage.get_heatmap().pair_attempts[ord("a") * 128 + ord("b")]
+    merges = writers * -(-count // batch)  # one merge per save
+    if attempts != merges:
+        problems.append(f"heatmap counts {attempts} merges, expected {merges}")
+    if hasattr(storage, "close"):
+        storage.close()
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="stress_storage.py",
+                                     description="Concurrent-writer stress test for Monkey-CLI's history storage.")
+    parser.add_argument("-p", "--processes", type=int, default=16, help="writer processes.")
+    parser.add_argument("-n", "--results", type=int, default=200, help="results per writer.")
+    parser.add_argument("-b", "--batch", type=int, default=1, help="results per save.")
+    parser.add_argument("--storage", choices=("jsonl", "sqlite", "both"), default="both",
+                        help="backend to stress.")
+    parser.add_argument("--no-compact", action="store_true",
+                        help="do not compact the JSON Lines log while writing.")
+    args = parser.parse_args()
+    if min(args.processes, args.results, args.batch) <= 0:
+        parser.error("counts must be positive")
+
+    failed = False
+    backends = ("jsonl", "sqlite") if args.storage == "both" else (args.storage,)
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, "history.db" if backend == "sqlite" else "history.jsonl")
+            # Create it before the race starts; closed before the workers
+            # fork, since an SQLite connection must not cross a fork
+            storage = open_storage(backend, path)
+            if hasattr(storage, "close"):
+                storage.close()
+            start_at = time.time() + 1.0
+            compact = backend == "jsonl" and not args.no_compact
+            with ProcessPoolExecutor(args.processes + compact) as pool:
+                compactor = pool.submit(run_compactor, path, start_at, 2.0) if compact else None
+                times = [f.result() for f in
+                         [pool.submit(run_writer, backend, path, w, args.results,
+                                      args.batch, start_at)
+                          for w in range(args.processes)]]
+                compactions = compactor.result() if compactor else 0
+            problems = check(backend, path, args.processes, args.results, args.batch)
+
+        total = args.processes * args.results
+        print(f"{backend}: {args.processes} writers x {args.results} results "
+              f"(batches of {args.batch}), {compactions} concurrent compactions, "
+              f"slowest writer {max(times):.2f}s, {total / max(times):.0f} results/s")
+        for problem in problems:
+            print(f"  FAIL: {problem}")
+        if not problems:
+            print(f"  ok: all {total} results present once, summary and heatmap agree")
+        failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,71 @@
 import curses
+import itertools
+import math
+import os
+import threading
 import time
 import random
 from typing import List, Tuple
-from datetime import datetime
-from data_storage import DataStorage
-from word_list import load_word_list
+import startup
+from renderer import Renderer
+from keystrokes import KeystrokeBuffer
+from heatmap import Heatmap
+from layout import Layout
+from input_state import InputState, UNTYPED, CORRECT, INCORRECT, OVERFLOW
+# Storage, dictionary and sampling modules are imported where they are
+# used, so a deferred test can draw its first frame before loading them.
+
+# Resolution of the on-screen timer, in seconds
+TIMER_TICK = 0.1
+
+# How often to check on a deferred load that is still running, in ms
+LOAD_POLL_MS = 15
+
+# Lines of target text shown, and the widest they get
+TEXT_LINES = 3
+MAX_LINE_WIDTH = 80
+
+# Progress bar for each number of filled cells, built once
+PROGRESS_WIDTH = 40
+_PROGRESS_BARS = tuple("[" + "=" * n + ">" + " " * (PROGRESS_WIDTH - n) + "]"
+                       for n in range(PROGRESS_WIDTH + 1))
+
+# Identifies each test's result to the writer, which saves it only once
+_test_ids = itertools.count()
+
+
+class Prefetch:
+    """Words for the next test, generated on a background thread."""
+    
+    def __init__(self, generate):
+        """
+        Start generating.
+        
+        Args:
+            generate: Callable returning the word list
+        """
+        self._words = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(generate,),
+                                        name="prefetch", daemon=True)
+        self._thread.start()
+    
+    def _run(self, generate):
+        try:
+            self._words = generate()
+        except BaseException as e:
+            self._error = e
+    
+    @property
+    def ready(self) -> bool:
+        return not self._thread.is_alive()
+    
+    def result(self) -> List[str]:
+        """Wait for the words, re-raising a failure to generate them."""
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._words
 
 
 class TypingTest:
@@ -15,30 +76,93 @@ class TypingTest:
                  duration: int      = 30,
                  word_count: int    = 50,
                  show_history: bool = False,
-                 dict_name:str      = "default"):
+                 dict_name:str      = "default",
+                 cache              = None,
+                 term               = curses,
+                 endless: bool      = False,
+                 sampling: str      = "uniform",
+                 drill: str         = None,
+                 corpus: str        = None,
+                 defer_load: bool   = False,
+                 race               = None,
+                 show_heatmap: bool = False,
+                 word_filter        = None,
+                 instruments        = None,
+                 ghost: bool        = False,
+                 rng                = None,
+                 prefetched         = None,
+                 passage: str       = None):
         """
         Initialize the typing test.
         
         Args:
             stdscr: curses standard screen object
             duration: Test duration in seconds
-            word_count: Number of words to generate
+            word_count: Number of words to generate (ignored when endless)
+            cache: Optional SessionCache shared across restarts
+            term: Provider of the screen-global curses calls (curs_set,
+                init_pair, color_pair, doupdate); the curses module itself,
+                or a headless stand-in
+            endless: Time-only test over lazily generated, unbounded text
+            sampling: How words are drawn (see sampling.SAMPLING_MODES)
+            drill: Keys to practice; words containing them are favoured
+            corpus: Text file bigrams are learned from ("natural" sampling)
+            defer_load: Load storage and generate words on a background
+                thread while the first frame is shown
+            race: Joined RaceClient; its text and time limit replace the
+                generated ones and the clock starts with the race
+            show_heatmap: Show the per-key error heatmap instead of a test
+            word_filter: Optional word_index.WordFilter restricting which
+                words of the dictionary are used
+            instruments: Optional instrumentation.Instruments that draw,
+                flush, input and key-to-screen times are recorded into
+            ghost: Replay the best stored run with the same dictionary, mode
+                and duration as a second cursor (not in race mode)
+            rng: random.Random the words are drawn from (the random module
+                when None); seed it to make a session's texts reproducible
+            prefetched: Prefetch of this test's words, started by the
+                previous test's results screen
+            passage: Plain-text corpus to type whole sentences of instead
+                of random words (dictionary options are ignored)
         """
         self.stdscr = stdscr
+        self.term = term
+        self.instruments = instruments
+        self.renderer = Renderer(stdscr, term, instruments)
         self.duration = duration
         self.word_count = word_count
         self.dict_name = dict_name
-        
-        # Data storage
-        self.storage = DataStorage()
-        
-        # Generate random words
-        self.words = self._generate_words()
-        self.target_text = " ".join(self.words)
+        self.cache = cache
+        self.endless = endless
+        self.sampling = sampling
+        self.drill = drill
+        self._auto_drill = drill == "auto"  # self.drill becomes the picked keys
+        self.corpus = corpus
+        self.word_filter = word_filter
+        self.passage = passage
+        if passage is not None:
+            self.dict_name = os.path.basename(passage)
+        self.race = race
+        if race is not None:
+            self.duration = race.duration
+        self._want_ghost = ghost and race is None
+        self.rng = rng if rng is not None else random
+        self.prefetched = prefetched
+        self.next_words = None  # Prefetch for the test after this one
+        self.ghost = None  # ghost.Ghost, found by _load_resources
+        
+        # Data storage and text, filled in by _load_resources
+        self.storage = None
+        self.writer = None
+        self._owns_writer = cache is None
+        self.test_id = next(_test_ids)
+        self.words = None
+        self.target_text = ""
         
         # User input tracking
-        self.user_input = ""
+        self.input = InputState(self.target_text)
         self.current_position = 0
+        self._layout = None  # layout.Layout of the text, built when first drawn
         
         # Statistics
         self.start_time = None
@@ -46,12 +170,19 @@ class TypingTest:
         self.correct_chars = 0
         self.incorrect_chars = 0
         self.total_chars_typed = 0
+        self.keystrokes = KeystrokeBuffer()
+        self.heatmap = Heatmap()
+        self._last_key_at = None
         self.show_history = show_history
+        self._history = None  # (statistics, recent results), read once
+        self.show_heatmap = show_heatmap
+        self._stored_heatmap = None
 
         
         self.results_drawn = False #use this flag to prevent from re-calculating accuracy
         self.wpm = None
         self.accuracy = None
+        self.key_summary = None
         
         
         # Test state
@@ -60,22 +191,132 @@ class TypingTest:
         
         # Setup curses
         self._setup_curses()
+        
+        self._loader = None
+        self._load_error = None
+        # Cached storage, ready words and a known ghost leave nothing worth deferring
+        ready = prefetched is not None and prefetched.ready and cache is not None \
+                 and (not self._want_ghost or
+                      cache.knows_best_run(self.dict_name, self.mode, self.duration))
+        if defer_load and not ready:
+            self._loader = threading.Thread(target=self._load_resources, daemon=True)
+            self._loader.start()
+        else:
+            self._load_resources()
+            self._wait_for_resources()
+    
+    def _load_resources(self):
+        """Open storage and generate the text (on a background thread when deferred)."""
+        try:
+            if self.cache:
+                storage = self.cache.storage()
+                writer = self.cache.writer()
+            else:
+                from data_storage import DataStorage
+                from result_writer import ResultWriter
+                storage = DataStorage()
+                writer = ResultWriter(storage)
+            
+            if self.drill == "auto" and self.passage is None:
+                # Practice the keys the stored heatmap says are weakest
+                self.drill = storage.get_heatmap().drill_keys()
+            
+            if self._want_ghost:
+                from ghost import Ghost
+                if self.cache:
+                    self.ghost = Ghost.of(self.cache.best_run(self.dict_name, self.mode,
+                                                              self.duration))
+                else:
+                    self.ghost = Ghost.best(storage, self.dict_name, self.mode, self.duration)
+            
+            # Generate random words
+            if self.endless:
+                from word_stream import WordStream
+                words, target_text = None, WordStream(self._stream_words())
+            elif self.race is not None:
+                target_text = self.race.text
+                words = target_text.split(" ")
+            else:
+                if self.prefetched is not None:
+                    words = self.prefetched.result()
+                else:
+                    words = self._generate_words()
+                target_text = " ".join(words)
+            
+            self.input = InputState(target_text)
+            self.storage, self.writer = storage, writer
+            self.words, self.target_text = words, target_text
+            startup.mark("resources loaded")
+        except BaseException as e:
+            # load_word_list exits on a missing dictionary; hand that to run()
+            self._load_error = e
+    
+    @property
+    def mode(self) -> str:
+        """Kind of test, as stored with its result."""
+        if self.race:
+            return "race"
+        if self.endless:
+            return "endless"
+        return "passage" if self.passage is not None else "standard"
+    
+    @property
+    def loading(self) -> bool:
+        """Whether a deferred load is still running."""
+        return self._loader is not None and self._loader.is_alive()
+    
+    def _wait_for_resources(self):
+        """Block until a deferred load is done, re-raising its failure."""
+        if self._loader is not None:
+            self._loader.join()
+            self._loader = None
+        if self._load_error is not None:
+            raise self._load_error
     
     def _setup_curses(self):
         """Initialize curses settings."""
-        curses.curs_set(1)  # Show cursor
-        curses.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Correct
-        curses.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)    # Incorrect
-        curses.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Normal text
-        curses.init_pair(4, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Stats (kept separate for easy customization)
-        curses.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Title (kept separate for easy customization)
-        self.stdscr.clear()
+        self.term.curs_set(1)  # Show cursor
+        self.term.init_pair(1, curses.COLOR_GREEN, curses.COLOR_BLACK)  # Correct
+        self.term.init_pair(2, curses.COLOR_RED, curses.COLOR_BLACK)    # Incorrect
+        self.term.init_pair(3, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Normal text
+        self.term.init_pair(4, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Stats (kept separate for easy customization)
+        self.term.init_pair(5, curses.COLOR_WHITE, curses.COLOR_BLACK)  # Title (kept separate for easy customization)
+        self.term.init_pair(6, curses.COLOR_YELLOW, curses.COLOR_BLACK) # Heatmap: some errors
+        self.renderer.invalidate()
+    
+    def _sampler(self):
+        """Get the word sampler, through the session cache when there is one."""
+        if self.cache:
+            return self.cache.sampler(self.dict_name, self.sampling, self.drill,
+                                      self.corpus, self.word_filter, not self._auto_drill)
+        from sampling import open_sampler
+        from word_list import load_word_list
+        words, variant = load_word_list(self.dict_name), ""
+        if self.word_filter:
+            from word_index import filter_word_list
+            words = filter_word_list(self.dict_name, words, self.word_filter)
+            variant = f"filter-{words.key}."
+        return open_sampler(self.dict_name, words, self.sampling, self.drill,
+                            self.corpus, variant, not self._auto_drill)
+    
+    def _passage(self):
+        """Get the passage corpus, through the session cache when there is one."""
+        if self.cache:
+            return self.cache.passage(self.passage)
+        from passage import open_passage
+        return open_passage(self.passage)
     
     def _generate_words(self) -> List[str]:
-        """Generate random words for the test."""
-        w_list = load_word_list(self.dict_name)
-        random.shuffle(w_list)
-        return [random.choice(w_list) for _ in range(self.word_count)]
+        """Generate random words (or pick a passage) for the test."""
+        if self.passage is not None:
+            return self._passage().passage(self.rng, self.word_count)
+        return list(itertools.islice(self._sampler().words(self.rng), self.word_count))
+    
+    def _stream_words(self):
+        """Endlessly yield random words (or passage text) for endless mode."""
+        if self.passage is not None:
+            return self._passage().words(self.rng)
+        return self._sampler().words(self.rng)
     
     def _calculate_wpm(self) -> float:
         """Calculate words per minute."""
@@ -113,8 +354,8 @@ class TypingTest:
         
         # Title
         title = "MONKEY-CLI - Terminal Typing Test"
-        self.stdscr.addstr(0, max(0, (width - len(title)) // 2), title, 
-                          curses.color_pair(5) | curses.A_BOLD)
+        self.renderer.put(0, max(0, (width - len(title)) // 2), title, 
+                          self.term.color_pair(5) | curses.A_BOLD)
         
         # Timer and stats
         if self.test_active and not self.test_completed:
@@ -123,101 +364,138 @@ class TypingTest:
             accuracy = self._calculate_accuracy()
             
             stats = f"Time: {time_remaining:.1f}s | WPM: {wpm:.0f} | Accuracy: {accuracy:.1f}%"
+        elif self.race is not None and self.race.start_at is None:
+            stats = f"Waiting for racers ({len(self.race.names)}/{self.race.players})..."
+        elif self.race is not None:
+            stats = f"Race starts in {max(0.0, self.race.start_at - time.time()):.1f}s..."
         else:
             stats = f"Duration: {self.duration}s | Press any key to start..."
         
-        self.stdscr.addstr(1, max(0, (width - len(stats)) // 2), stats, 
-                          curses.color_pair(4))
+        self.renderer.put(1, max(0, (width - len(stats)) // 2), stats, 
+                          self.term.color_pair(4))
         
         # Separator
-        self.stdscr.addstr(2, 0, "─" * width)
+        self.renderer.put(2, 0, "─" * width)
     
     def _draw_text(self):
-        """Draw the target text with color-coded characters in a single centered line."""
+        """Draw the target text word-wrapped, three lines around the cursor."""
         height, width = self.stdscr.getmaxyx()
         
         center_row = height // 2
-        
-        max_visible_chars = width - 4
-        
-        if self.current_position <= max_visible_chars // 2:
-            start_pos = 0
-        elif len(self.target_text) - self.current_position <= max_visible_chars // 2:
-            start_pos = max(0, len(self.target_text) - max_visible_chars)
+        length = len(self.target_text)
+        
+        # Line breaks are kept per width and only redone after a resize
+        if self._layout is None:
+            self._layout = Layout(max(10, min(width - 4, MAX_LINE_WIDTH)), self.input.base)
+        layout = self._layout
+        layout.extend(self.target_text)
+        start_col = max(0, (width - layout.width) // 2)
+        
+        # The cursor's line stays in the middle once the first line is done
+        typed = self.input.position
+        cursor_line = layout.line_of(typed)
+        first_line = max(0, min(cursor_line - 1, layout.lines - TEXT_LINES))
+        
+        ghost = None
+        if self.ghost is not None and self.test_active:
+            ghost = self.ghost.advance(time.time() - self.start_time)
+        
+        # Colors come straight from the per-position status array
+        colors = {UNTYPED: self.term.color_pair(3),
+                  CORRECT: self.term.color_pair(1),
+                  INCORRECT: self.term.color_pair(2)}
+        for i, line in enumerate(range(first_line, min(first_line + TEXT_LINES, layout.lines))):
+            start_pos, end_pos = layout.bounds(line, length)
+            start_pos = max(start_pos, self.input.base)
+            attrs = [colors[status] for status in self.input.statuses(start_pos, end_pos)]
+            if start_pos <= typed < end_pos:
+                attrs[typed - start_pos] |= curses.A_UNDERLINE
+            if ghost is not None and start_pos <= ghost < end_pos and ghost != typed:
+                attrs[ghost - start_pos] |= curses.A_REVERSE
+            # One addstr per run of equally colored characters
+            self.renderer.put_runs(center_row - 1 + i, start_col,
+                                   self.target_text[start_pos:end_pos], attrs)
+            if line == cursor_line:
+                self.renderer.set_cursor(center_row - 1 + i, start_col + typed - start_pos)
+                if typed >= length:
+                    self.renderer.put(center_row - 1 + i, start_col + end_pos - start_pos,
+                                      "|", self.term.color_pair(3) | curses.A_BOLD)
+        
+        if self.endless:
+            # No end to the text: show how much of the time is used up
+            progress = 1 - self._get_time_remaining() / self.duration
+            progress_text = f"Position: {self.current_position}"
         else:
-            start_pos = self.current_position - max_visible_chars // 2
-        
-        end_pos = min(len(self.target_text), start_pos + max_visible_chars)
-        
-        text_to_display = self.target_text[start_pos:end_pos]
-        start_col = (width - len(text_to_display)) // 2
-        
-        for i in range(len(text_to_display)):
-            actual_pos = start_pos + i
-            char = text_to_display[i]
-            col = start_col + i
-            
-            if actual_pos < len(self.user_input):
-                if self.user_input[actual_pos] == char:
-                    color = curses.color_pair(1)
-                else:
-                    color = curses.color_pair(2)
-            elif actual_pos == len(self.user_input):
-                color = curses.color_pair(3) | curses.A_UNDERLINE
-            else:
-                color = curses.color_pair(3)
-            
-            try:
-                self.stdscr.addstr(center_row, col, char, color)
-            except curses.error:
-                pass
-        
-        if len(self.user_input) >= len(self.target_text):
-            try:
-                self.stdscr.addstr(center_row, start_col + len(text_to_display), 
-                                 "|", curses.color_pair(3) | curses.A_BOLD)
-            except curses.error:
-                pass
+            progress = self.current_position / length
+            progress_text = f"Position: {self.current_position}/{length}"
+        progress_bar = _PROGRESS_BARS[min(PROGRESS_WIDTH, int(progress * PROGRESS_WIDTH))]
+        
+        self.renderer.put(center_row + 2, (width - len(progress_bar)) // 2, 
+                          progress_bar, self.term.color_pair(3))
+        self.renderer.put(center_row + 3, (width - len(progress_text)) // 2,
+                          progress_text, self.term.color_pair(4))
+        
+        if ghost is not None:
+            lead = self.current_position - ghost
+            ghost_text = f"Ghost ({self.ghost.wpm:.0f} WPM): " + \
+                (f"{lead} ahead" if lead > 0 else f"{-lead} behind" if lead < 0 else "level")
+            self.renderer.put(center_row + 4, (width - len(ghost_text)) // 2,
+                              ghost_text, self.term.color_pair(1 if lead >= 0 else 6))
+        
+        if self.race is not None:
+            self._draw_race(center_row + 5)
+    
+    def _draw_race(self, row: int):
+        """Draw one progress bar per racer, in join order so rows stay put."""
+        height, width = self.stdscr.getmaxyx()
         
-        progress_width = 40
-        progress_bar = "[" + "=" * int((self.current_position / len(self.target_text)) * progress_width) + \
-                       ">" + " " * (progress_width - int((self.current_position / len(self.target_text)) * progress_width)) + "]"
-        progress_text = f"Position: {self.current_position}/{len(self.target_text)}"
+        bar_width = 30
+        total = max(1, len(self.target_text))
+        for racer_id, name, pos, wpm, done in self.race.standings():
+            if row >= height - 1:
+                break
+            if racer_id == self.race.id:
+                # Our own bar is drawn from local state, not the last snapshot
+                name, pos, done = "you", self.current_position, self.test_completed
+                wpm = self.wpm if done else self._calculate_wpm()
+            filled = bar_width * min(pos, total) // total
+            line = f"{name:<16.16} [{'=' * filled}{' ' * (bar_width - filled)}] {wpm:4.0f} wpm"
+            line += "  done" if done else "      "
+            color = 1 if done else (5 if racer_id == self.race.id else 3)
+            self.renderer.put(row, max(0, (width - len(line)) // 2), line,
+                              self.term.color_pair(color))
+            row += 1
+    
+    def _draw_loading(self):
+        """Stand-in for the text while a deferred load is running."""
+        height, width = self.stdscr.getmaxyx()
         
-        try:
-            self.stdscr.addstr(center_row + 1, (width - len(progress_bar)) // 2, 
-                             progress_bar, curses.color_pair(3))
-            self.stdscr.addstr(center_row + 2, (width - len(progress_text)) // 2,
-                             progress_text, curses.color_pair(4))
-        except curses.error:
-            pass
+        message = f"Loading {self.dict_name}..."
+        self.renderer.put(height // 2, max(0, (width - len(message)) // 2),
+                          message, self.term.color_pair(3))
     
     def _draw_footer(self):
         """Draw the footer with instructions."""
         height, width = self.stdscr.getmaxyx()
         
-        footer = "ESC: Restart | Ctrl+C: Quit"
-        try:
-            self.stdscr.addstr(height - 1, max(0, (width - len(footer)) // 2), 
-                             footer, curses.color_pair(3))
-        except curses.error:
-            pass
+        footer = "ESC: Leave race | Ctrl+C: Quit" if self.race else "ESC: Restart | Ctrl+C: Quit"
+        self.renderer.put(height - 1, max(0, (width - len(footer)) // 2), 
+                          footer, self.term.color_pair(3))
     
     def _draw_results(self):
         """Draw the final results screen."""
         height, width = self.stdscr.getmaxyx()
         
-        self.stdscr.clear()
-        
         # Title
         title = "Test Complete!"
-        self.stdscr.addstr(height // 2 - 6, max(0, (width - len(title)) // 2), 
-                          title, curses.color_pair(5) | curses.A_BOLD)
+        self.renderer.put(height // 2 - 6, max(0, (width - len(title)) // 2), 
+                          title, self.term.color_pair(5) | curses.A_BOLD)
         
         #Results
         if not self.results_drawn:
             self.wpm = self._calculate_wpm()
             self.accuracy = self._calculate_accuracy()
+            self.key_summary = self.keystrokes.summary()
             self.results_drawn = True
         
         results = [
@@ -225,75 +503,103 @@ class TypingTest:
             f"Accuracy: {self.accuracy:.2f}%",
             f"Correct Characters: {self.correct_chars}",
             f"Incorrect Characters: {self.incorrect_chars}",
-            f"Total Characters: {self.total_chars_typed}"
+            f"Total Characters: {self.total_chars_typed}",
+            f"Burst WPM: {self.key_summary['burst_wpm']:.0f} | "
+            f"Consistency: {self.key_summary['consistency']:.0f}% | "
+            f"Key interval: {self.key_summary['mean_interval_ms']:.0f}ms"
         ]
+        if self.ghost is not None:
+            results.append(f"Ghost: {self.ghost.wpm:.2f} WPM ({self.wpm - self.ghost.wpm:+.2f})")
         
         for i, line in enumerate(results):
-            self.stdscr.addstr(height // 2 - 4 + i, max(0, (width - len(line)) // 2), 
-                             line, curses.color_pair(4))
+            self.renderer.put(height // 2 - 4 + i, max(0, (width - len(line)) // 2), 
+                              line, self.term.color_pair(4))
         
         # Instructions
         instruction = "Press ESC to restart |  Ctrl+C to quit"
-        self.stdscr.addstr(height // 2 + 4, max(0, (width - len(instruction)) // 2), 
-                          instruction, curses.color_pair(3))
-        
-        self.stdscr.refresh()
+        if self.race is not None:
+            instruction = "Press ESC to leave the race |  Ctrl+C to quit"
+            self._draw_race(height // 2 + 6)
+        self.renderer.put(height // 2 + 4, max(0, (width - len(instruction)) // 2), 
+                          instruction, self.term.color_pair(3))
+    
+    def _prefetch_next(self):
+        """Start generating the next test's words while the results are up."""
+        # Most sessions restart from the results screen: have the next text
+        # ready by then. Auto drill keys are picked from the heatmap this
+        # test is still adding to, so the next test picks its own.
+        if self.race is None and not self.endless and not self._auto_drill:
+            self.next_words = Prefetch(self._generate_words)
     
     def _save_result(self):
-        """Save the test result to storage."""
+        """Queue the test result for the background writer."""
         if self.test_completed and self.start_time:
+            from data_storage import build_result
             wpm = self._calculate_wpm()
             accuracy = self._calculate_accuracy()
-            self.storage.save_result(
+            result = build_result(
                 wpm=wpm,
                 accuracy=accuracy,
                 correct_chars=self.correct_chars,
                 incorrect_chars=self.incorrect_chars,
                 total_chars=self.total_chars_typed,
-                duration=self.duration
+                duration=self.duration,
+                dictionary=self.dict_name,
+                mode=self.mode,
+                keystrokes=self.keystrokes.encode()
             )
+            # Duplicate completion events for this test are dropped by the writer
+            self.writer.submit(self.test_id, result, heatmap=self.heatmap)
+            if self.cache:
+                self.cache.record_run(result)
+            if self.race is not None:
+                self.race.finish(self.current_position, wpm, accuracy)
     
     def _draw_history(self):
         """Draw the history screen with statistics and graphs."""
         height, width = self.stdscr.getmaxyx()
-        self.stdscr.clear()
         
-        # Get statistics
-        stats = self.storage.get_statistics()
-        recent = self.storage.get_recent_results(10)
+        # Get statistics (precomputed summary; nothing changes while shown)
+        if self._history is None:
+            self.writer.flush()  # include results still in the queue
+            self._history = (self.storage.get_statistics(),
+                             self.storage.get_recent_results(10))
+        stats, recent = self._history
         
         row = 1
         
         # Title
         title = "Typing History & Statistics"
-        self.stdscr.addstr(row, max(0, (width - len(title)) // 2), 
-                          title, curses.color_pair(5) | curses.A_BOLD)
+        self.renderer.put(row, max(0, (width - len(title)) // 2), 
+                          title, self.term.color_pair(5) | curses.A_BOLD)
         row += 2
         
         # Overall statistics
         if stats["total_tests"] > 0:
-            self.stdscr.addstr(row, 2, "Overall Statistics:", curses.color_pair(5))
+            self.renderer.put(row, 2, "Overall Statistics:", self.term.color_pair(5))
             row += 1
             
             stats_lines = [
                 f"  Total Tests: {stats['total_tests']}",
-                f"  Average WPM: {stats['average_wpm']:.2f}",
+                f"  Average WPM: {stats['average_wpm']:.2f} (±{stats['wpm_stddev']:.2f})",
                 f"  Best WPM: {stats['best_wpm']:.2f}",
+                f"  Worst WPM: {stats['worst_wpm']:.2f}",
+                f"  Median / 90th pct WPM: {stats['median_wpm']:.0f} / {stats['p90_wpm']:.0f}",
                 f"  Average Accuracy: {stats['average_accuracy']:.2f}%",
                 f"  Best Accuracy: {stats['best_accuracy']:.2f}%",
                 f"  Total Characters Typed: {stats['total_chars']}"
             ]
             
             for line in stats_lines:
-                self.stdscr.addstr(row, 2, line, curses.color_pair(3))
+                self.renderer.put(row, 2, line, self.term.color_pair(3))
                 row += 1
             
             row += 1
             
             # Recent results graph
             if recent:
-                self.stdscr.addstr(row, 2, "Recent WPM Trend (Last 10 Tests):", 
-                                 curses.color_pair(5))
+                self.renderer.put(row, 2, "Recent WPM Trend (Last 10 Tests):", 
+                                  self.term.color_pair(5))
                 row += 1
                 
                 # Draw simple bar chart
@@ -303,6 +609,7 @@ class TypingTest:
                 for i, result in enumerate(recent):
                     # Date
                     try:
+                        from datetime import datetime
                         date = datetime.fromisoformat(result["timestamp"])
                         date_str = date.strftime("%m/%d %H:%M")
                     except:
@@ -315,27 +622,79 @@ class TypingTest:
                     # Display
                     line = f"  {date_str}: {bar} {result['wpm']:.1f}"
                     if row < height - 2:
-                        try:
-                            self.stdscr.addstr(row, 2, line[:width-3], curses.color_pair(4))
-                        except curses.error:
-                            pass
+                        self.renderer.put(row, 2, line[:width-3], self.term.color_pair(4))
                     row += 1
         else:
-            self.stdscr.addstr(row, 2, "No test history yet. Complete a test to see statistics!", 
-                             curses.color_pair(3))
+            self.renderer.put(row, 2, "No test history yet. Complete a test to see statistics!", 
+                              self.term.color_pair(3))
         
         # Footer
         footer = "Ctrl+C to quit"
-        try:
-            self.stdscr.addstr(height - 1, max(0, (width - len(footer)) // 2), 
-                             footer, curses.color_pair(3))
-        except curses.error:
-            pass
+        self.renderer.put(height - 1, max(0, (width - len(footer)) // 2), 
+                          footer, self.term.color_pair(3))
+    
+    def _draw_heatmap(self):
+        """Draw the per-key error heatmap and the weakest keys and key pairs."""
+        height, width = self.stdscr.getmaxyx()
         
-        self.stdscr.refresh()
+        # Read once (after queued results are written); nothing changes while shown
+        if self._stored_heatmap is None:
+            self.writer.flush()
+            self._stored_heatmap = self.storage.get_heatmap()
+        heatmap = self._stored_heatmap
+        
+        title = "Key Heatmap (error rate)"
+        self.renderer.put(1, max(0, (width - len(title)) // 2), title,
+                          self.term.color_pair(5) | curses.A_BOLD)
+        
+        if not heatmap:
+            self.renderer.put(3, 2, "No keystrokes recorded yet. Complete a test to see the heatmap!",
+                              self.term.color_pair(3))
+        else:
+            # Keyboard: one reversed cell per key, colored by error rate
+            left = max(0, (width - 54) // 2)
+            for i, keys in enumerate(("1234567890-=", "qwertyuiop[]", "asdfghjkl;'", "zxcvbnm,./")):
+                col = left + 2 * i
+                for key in keys:
+                    attempts, rate, _ = heatmap.key_stats(ord(key))
+                    color = 3 if not attempts else 1 if rate < 2 else 6 if rate < 5 else 2
+                    self.renderer.put(3 + i, col, f" {key} ",
+                                      self.term.color_pair(color) | curses.A_REVERSE)
+                    col += 4
+            attempts, rate, _ = heatmap.key_stats(ord(" "))
+            color = 3 if not attempts else 1 if rate < 2 else 6 if rate < 5 else 2
+            self.renderer.put(7, left + 12, " " * 20, self.term.color_pair(color) | curses.A_REVERSE)
+            legend = "green < 2%   yellow < 5%   red >= 5%   white: no data"
+            self.renderer.put(9, max(0, (width - len(legend)) // 2), legend,
+                              self.term.color_pair(4))
+            
+            # Weakest keys and key pairs side by side
+            row = 11
+            self.renderer.put(row, 2, "Weakest keys:", self.term.color_pair(5))
+            self.renderer.put(row, width // 2, "Weakest key pairs:", self.term.color_pair(5))
+            keys = heatmap.weakest_keys(height - row - 3)
+            pairs = heatmap.weakest_bigrams(height - row - 3)
+            for i in range(max(len(keys), len(pairs))):
+                row += 1
+                if row >= height - 2:
+                    break
+                for col, entries in ((2, keys), (width // 2, pairs)):
+                    if i < len(entries):
+                        label, attempts, rate, ms = entries[i]
+                        line = f"  {label.replace(' ', '␣'):<3} {rate:5.1f}% errors  {ms:5.0f}ms  ({attempts})"
+                        self.renderer.put(row, col, line[:width // 2 - 2], self.term.color_pair(4))
+        
+        footer = "Ctrl+C to quit"
+        self.renderer.put(height - 1, max(0, (width - len(footer)) // 2),
+                          footer, self.term.color_pair(3))
     
     def _handle_input(self, char: int):
         """Handle user input."""
+        if self.race is not None and not self.test_active:
+            self._sync_race()
+            if not self.test_active:
+                return True  # everyone starts together when the race clock says so
+        
         # Start test on first keypress
         if not self.test_active:
             self.test_active = True
@@ -347,88 +706,194 @@ class TypingTest:
         
         # Backspace
         if char in [curses.KEY_BACKSPACE, 127, 8]:
-            if len(self.user_input) > 0:
-                # Get the character being deleted
-                deleted_char = self.user_input[-1]
-                deleted_pos = len(self.user_input) - 1
+            if self.input.typed:
+                # Remove the character
+                deleted = self.input.delete()
+                self.current_position = self.input.position
                 
                 # Adjust counters based on whether it was correct or incorrect
-                if deleted_pos < len(self.target_text):
-                    if deleted_char == self.target_text[deleted_pos]:
-                        if self.correct_chars > 0:
-                            self.correct_chars -= 1
-                    else:
-                        if self.incorrect_chars > 0:
-                            self.incorrect_chars -= 1
-                
-                # Remove the character
-                self.user_input = self.user_input[:-1]
-                self.current_position = len(self.user_input)
+                if deleted == CORRECT:
+                    if self.correct_chars > 0:
+                        self.correct_chars -= 1
+                elif deleted == INCORRECT:
+                    if self.incorrect_chars > 0:
+                        self.incorrect_chars -= 1
                 
                 if self.total_chars_typed > 0:
                     self.total_chars_typed -= 1
+                self._last_key_at = time.monotonic()
+                self.keystrokes.record(self._last_key_at, char, self.current_position, False)
             return True
         
         # Regular character
         if 32 <= char <= 126:  # Printable ASCII
-            typed_char = chr(char)
-            self.user_input += typed_char
-            self.current_position = len(self.user_input)
+            # Check if character is correct
+            typed = self.input.append(char)
+            self.current_position = self.input.position
             self.total_chars_typed += 1
             
-            # Check if character is correct
-            if len(self.user_input) <= len(self.target_text):
-                if self.user_input[-1] == self.target_text[len(self.user_input) - 1]:
-                    self.correct_chars += 1
-                else:
-                    self.incorrect_chars += 1
+            if typed == CORRECT:
+                self.correct_chars += 1
+            elif typed == INCORRECT:
+                self.incorrect_chars += 1
+            now = time.monotonic()
+            self.keystrokes.record(now, char, self.current_position - 1, typed == CORRECT)
+            
+            # Per-key counters; the first key of a test has no latency to count
+            if typed != OVERFLOW:
+                pos = self.current_position - 1
+                latency = None if self._last_key_at is None else now - self._last_key_at
+                self.heatmap.record(self.target_text[pos - 1] if pos > 0 else None,
+                                    self.target_text[pos], typed == CORRECT, latency)
+            self._last_key_at = now
+            
+            if self.endless:
+                # Generate ahead of the cursor, forget what scrolled away
+                self.target_text.advance(self.current_position)
+                self.input.trim(self.target_text.base)
             
             # Check if test is complete
-            if self.user_input == self.target_text:
+            if self.input.complete:
                 self.test_completed = True
                 self.end_time = time.time()
                 self._save_result()
         
         return True
     
+    def _check_completion(self):
+        """End the test when the text is done or the time is up."""
+        if self.test_completed:
+            return
+        
+        # Check time limit; stamp the exact deadline rather than the wakeup time
+        # (finishing the text is caught in _handle_input via input.complete)
+        if self.test_active and self._get_time_remaining() <= 0:
+            self.test_completed = True
+            self.end_time = self.start_time + self.duration
+            self._save_result()
+    
+    def _sync_race(self):
+        """Start on the race clock and report progress to the server."""
+        race = self.race
+        if not self.test_active:
+            if race.start_at is not None and time.time() >= race.start_at:
+                self.test_active = True
+                self.start_time = race.start_at
+        elif not self.test_completed:
+            race.update(self.current_position, self._calculate_wpm())
+    
+    def _next_timeout_ms(self) -> int:
+        """
+        Milliseconds until the next scheduled frame, or -1 to block on input.
+        
+        While a test runs the loop wakes on the next timer-display tick or
+        at the deadline, whichever comes first; otherwise nothing changes
+        on screen without a keypress.
+        """
+        if self.loading:
+            return LOAD_POLL_MS
+        if self.race is not None and not self.race.ended and \
+                (self.test_completed or not self.test_active):
+            # Keep opponents' bars and the countdown moving; wake for the start
+            until = TIMER_TICK
+            if not self.test_active and self.race.start_at is not None:
+                until = min(until, self.race.start_at - time.time())
+            return max(1, math.ceil(until * 1000))
+        if self.show_history or self.show_heatmap or self.test_completed or not self.test_active:
+            return -1
+        
+        elapsed = time.time() - self.start_time
+        until_tick = TIMER_TICK - (elapsed % TIMER_TICK)
+        until_deadline = self.duration - elapsed
+        return max(1, math.ceil(min(until_tick, until_deadline) * 1000))
+    
     def run(self):
         """Run the typing test main loop."""
-        self.stdscr.timeout(100)  # 100ms timeout for non-blocking input
+        try:
+            return self._run()
+        finally:
+            # A restart must not leave the loader running beside the next
+            # test's, which shares the session cache; a failure no longer
+            # matters once the test is abandoned
+            if self._loader is not None:
+                self._loader.join()
+                self._loader = None
+            if self._owns_writer and self.writer is not None:
+                self.writer.close()
+    
+    def _timed(self, phase: str, step, *args):
+        """Run one step of the loop, timing it when instrumented."""
+        if self.instruments is None:
+            return step(*args)
+        started = time.perf_counter()
+        result = step(*args)
+        self.instruments.record(phase, time.perf_counter() - started)
+        return result
+    
+    def _draw_overlay(self):
+        """Draw the instrumentation summary above the footer."""
+        line = self.instruments.overlay_line()
+        if line:
+            height, width = self.stdscr.getmaxyx()
+            self.renderer.put(height - 2, 0, line[:max(0, width - 1)], self.term.color_pair(3))
+    
+    def _run(self):
         self.results_drawn = False
+        instruments = self.instruments
+        key_at = None  # when the oldest key not yet on screen was read
         while True:
-            # Clear and redraw
-            self.stdscr.clear()
+            if not self.loading:
+                self._wait_for_resources()
+                if self.race is not None:
+                    self._sync_race()
+                self._check_completion()
+            
+            # Build the frame; only rows that changed reach the terminal
+            frame_started = time.perf_counter() if instruments else 0.0
+            self.renderer.begin()
             
-            if self.show_history:
-                self._draw_history()
+            if self.loading:
+                self._draw_header()
+                self._draw_loading()
+                self._draw_footer()
+            elif self.show_heatmap:
+                self._timed("heatmap", self._draw_heatmap)
+            elif self.show_history:
+                self._timed("history", self._draw_history)
             elif self.test_completed:
-                self._draw_results()
+                if self.next_words is None:
+                    self._prefetch_next()
+                self._timed("results", self._draw_results)
             else:
-                self._draw_header()
-                self._draw_text()
+                self._timed("header", self._draw_header)
+                self._timed("text", self._draw_text)
                 self._draw_footer()
-                self.stdscr.refresh()
-
-            #if all characters are typed, then stop test
-            if len(self.target_text)-1 == self.current_position:
-                self.test_completed = True
-                self.end_time = time.time()
-                self._save_result()
+            if instruments is not None and instruments.overlay:
+                self._draw_overlay()
+            self._timed("flush", self.renderer.flush)
+            startup.mark("first frame")
+            if instruments is not None:
+                shown = time.perf_counter()
+                instruments.record("frame", shown - frame_started)
+                if key_at is not None:
+                    instruments.record("key_to_screen", shown - key_at)
+                    key_at = None
             
-            # Check time limit
-            if self.test_active and not self.test_completed:
-                if self._get_time_remaining() <= 0:
-                    self.test_completed = True
-                    self.end_time = time.time()
-                    self._save_result()
-            
-                    
-            # Get input
+            # Get input: sleep until a key arrives or the next tick is due
             try:
+                self.stdscr.timeout(self._next_timeout_ms())
                 char = self.stdscr.getch()
-                if char != -1:  # -1 means no input (timeout)
+                if instruments is not None and char != -1:
+                    key_at = time.perf_counter()
+                
+                # Drain everything already queued so bursts render once
+                self.stdscr.timeout(0)
+                while char != -1:  # -1 means no input (timeout)
+                    if char == curses.KEY_RESIZE:
+                        self.renderer.invalidate()
+                        self._layout = None  # re-wrap for the new width
                     # ESC key
-                    if char == 27:
+                    elif char == 27:
                         # Restart requested
                         return True
                     #THIS IS LITERALLY NOT OK
@@ -439,10 +904,14 @@ class TypingTest:
                     #this project with his only companion - Copilot.
                     #It works and it's good enough, so let it be.
                     #Let this code will be forever and ever crap.                
-                    if not self.results_drawn:
-                        if not self._handle_input(char):
-                            # Restart requested
-                            return True
+                    elif not self.results_drawn:
+                        self._wait_for_resources()
+                        self._check_completion()
+                        if not self.test_completed:
+                            if not self._timed("input", self._handle_input, char):
+                                # Restart requested
+                                return True
+                    char = self.stdscr.getch()
             except KeyboardInterrupt:
                 return False
         
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Dictionary index for Monkey-CLI's word filters (--min-length, --contains, ...).
+
+Each dictionary gets an index, built once and cached in dicts/.cache/:
+word ids grouped into buckets by length, plus a 27-bit mask per word
+(one bit per letter, one for anything else). A length range is then a
+contiguous slice of the index and a letter filter is one AND per word in
+that slice. The ids a filter selects are cached too, so later runs with
+the same flags just map a file instead of looking at any words.
+"""
+
+import hashlib
+import struct
+import sys
+from array import array
+from string import ascii_lowercase
+from typing import Optional
+
+from word_list import cache_path, map_cache, source_stamp, write_cache
+
+# Words longer than this are bucketed (and filtered) as this long
+MAX_LENGTH = 64
+
+# Mask bit for any character that is not a letter
+OTHER = 1 << 26
+_LETTER_BITS = {c: 1 << i for i, c in enumerate(ascii_lowercase)}
+_ALL_LETTERS = (1 << 26) - 1
+
+# Index file: magic, version, source size, source mtime, word count, max length
+_INDEX_MAGIC = b"MKIX"
+# Filter file: magic, version, source size, source mtime, word count, matches
+_FILTER_MAGIC = b"MKFI"
+_HEADER = struct.Struct("=4sIQQII")
+_VERSION = 1
+
+
+def letter_mask(text: str) -> int:
+    """Bit set of the letters in `text` (case-insensitive), plus OTHER."""
+    mask = 0
+    for ch in text.lower():
+        mask |= _LETTER_BITS.get(ch, OTHER)
+    return mask
+
+
+class WordFilter:
+    """Which words of a dictionary a test may use."""
+
+    def __init__(self, min_length: Optional[int] = None, max_length: Optional[int] = None,
+                 contains: Optional[str] = None, only: Optional[str] = None,
+                 no_punctuation: bool = False):
+        """
+        Args:
+            min_length: Shortest word allowed
+            max_length: Longest word allowed
+            contains: Keep words with at least one of these letters (any
+                non-letter here matches every non-letter character)
+            only: Keep words made only of these letters
+            no_punctuation: Drop words with anything but letters
+        """
+        self.min_length = min_length
+        self.max_length = max_length
+        self.contains = "".join(sorted(set(contains.lower()))) if contains else None
+        self.only = "".join(sorted(set(only.lower()))) if only else None
+        self.no_punctuation = no_punctuation
+
+    def __bool__(self) -> bool:
+        return any((self.min_length, self.max_length, self.contains, self.only,
+                    self.no_punctuation))
+
+    def key(self) -> str:
+        """Short stable id of the filter, for cache file names."""
+        spec = (f"{self.min_length}-{self.max_length}|{self.contains}|{self.only}|"
+                f"{int(self.no_punctuation)}")
+        return hashlib.sha1(spec.encode()).hexdigest()[:12]
+
+    def __str__(self) -> str:
+        parts = []
+        if self.min_length or self.max_length:
+            parts.append(f"length {self.min_length or 1}-{self.max_length or 'any'}")
+        if self.contains:
+            parts.append(f"containing any of '{self.contains}'")
+        if self.only:
+            parts.append(f"only '{self.only}'")
+        if self.no_punctuation:
+            parts.append("no punctuation")
+        return ", ".join(parts) or "no filter"
+
+
+class WordIndex:
+    """Word ids bucketed by length, with a letter mask per entry."""
+
+    def __init__(self, offsets, order, masks):
+        """
+        Args:
+            offsets: offsets[n] is where words of length n start in `order`
+                (MAX_LENGTH + 2 entries)
+            order: Word ids sorted by length (ascending ids within a length)
+            masks: letter_mask of each entry of `order`
+        """
+        self.offsets = offsets
+        self.order = order
+        self.masks = masks
+
+    @classmethod
+    def build(cls, word_list) -> "WordIndex":
+        buckets = [array("I") for _ in range(MAX_LENGTH + 1)]
+        bucket_masks = [array("I") for _ in range(MAX_LENGTH + 1)]
+        for i in range(len(word_list)):
+            word = word_list[i]
+            length = min(len(word), MAX_LENGTH)
+            buckets[length].append(i)
+            bucket_masks[length].append(letter_mask(word))
+        offsets, order, masks = array("I"), array("I"), array("I")
+        for ids, id_masks in zip(buckets, bucket_masks):
+            offsets.append(len(order))
+            order.extend(ids)
+            masks.extend(id_masks)
+        offsets.append(len(order))
+        return cls(offsets, order, masks)
+
+    def select(self, word_filter: WordFilter) -> array:
+        """Ids of the words that pass the filter, ascending (frequency order)."""
+        lo = max(1, min(word_filter.min_length or 1, MAX_LENGTH))
+        hi = max(0, min(word_filter.max_length or MAX_LENGTH, MAX_LENGTH))
+        start, stop = self.offsets[lo], self.offsets[max(lo, hi + 1)]
+
+        # A non-letter in `contains` stands for any non-letter
+        wanted = letter_mask(word_filter.contains) if word_filter.contains else 0
+        forbidden = 0
+        if word_filter.only:
+            forbidden |= (~letter_mask(word_filter.only) & _ALL_LETTERS) | OTHER
+        if word_filter.no_punctuation:
+            forbidden |= OTHER
+
+        order, masks = self.order, self.masks
+        if not wanted and not forbidden:
+            return array("I", sorted(order[start:stop]))
+        return array("I", sorted(
+            order[k] for k in range(start, stop)
+            if (not wanted or masks[k] & wanted) and not masks[k] & forbidden))
+
+
+class FilteredWordList:
+    """Read-only view of the words of a dictionary that pass a filter."""
+
+    def __init__(self, word_list, ids, key: str, mapped=None):
+        """
+        Args:
+            word_list: The whole dictionary
+            ids: Indexes into it of the words that passed
+            key: WordFilter.key() of the filter
+            mapped: (mmap, view) that `ids` was sliced from, if any
+        """
+        self.word_list = word_list
+        self.ids = ids
+        self.key = key
+        self._mapped = mapped
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> str:
+        return self.word_list[self.ids[index]]
+
+    def close(self):
+        if self._mapped is not None:
+            mm, view = self._mapped
+            self.ids.release()
+            view.release()
+            mm.close()
+            self._mapped = None
+
+
+def _load(path: str, magic: bytes, stamp, count: int):
+    """Map a cache file and return (mmap, header extra, payload view), or None if stale."""
+    try:
+        mm = map_cache(path)
+    except (OSError, ValueError):
+        return None
+    try:
+        found, version, size, mtime, n, extra = _HEADER.unpack_from(mm, 0)
+    except struct.error:
+        mm.close()
+        return None
+    if (found, version, size, mtime, n) != (magic, _VERSION) + stamp + (count,):
+        mm.close()
+        return None
+    return mm, extra, memoryview(mm)[_HEADER.size:].cast("I")
+
+
+def open_index(name: str, word_list) -> WordIndex:
+    """Load the cached index of dicts/<name>, rebuilding it when the dictionary changed."""
+    path = cache_path(name, "index")
+    stamp = source_stamp(name)
+    n = len(word_list)
+    loaded = _load(path, _INDEX_MAGIC, stamp, n)
+    if loaded is not None:
+        _, max_length, view = loaded
+        if max_length == MAX_LENGTH:
+            k = MAX_LENGTH + 2
+            return WordIndex(view[:k], view[k:k + n], view[k + n:k + 2 * n])
+
+    index = WordIndex.build(word_list)
+    try:
+        write_cache(path, (_HEADER.pack(_INDEX_MAGIC, _VERSION, *stamp, n, MAX_LENGTH),
+                           index.offsets.tobytes(), index.order.tobytes(),
+                           index.masks.tobytes()))
+    except OSError:
+        pass  # read-only checkout: keep the index in memory only
+    return index
+
+
+def filter_word_list(name: str, word_list, word_filter: WordFilter) -> FilteredWordList:
+    """
+    Get the words of dicts/<name> that pass a filter.
+
+    Selections are cached per filter, so repeating one does not touch
+    the index or the words at all. Exits with a message if nothing matches.
+    """
+    key = word_filter.key()
+    path = cache_path(name, f"filter-{key}")
+    stamp = source_stamp(name)
+    n = len(word_list)
+    loaded = _load(path, _FILTER_MAGIC, stamp, n)
+    if loaded is not None:
+        mm, matches, view = loaded
+        ids, mapped = view[:matches], (mm, view)
+    else:
+        mapped = None
+        ids = open_index(name, word_list).select(word_filter)
+        try:
+            write_cache(path, (_HEADER.pack(_FILTER_MAGIC, _VERSION, *stamp, n, len(ids)),
+                               ids.tobytes()))
+        except OSError:
+            pass
+
+    if not len(ids):
+        print(f"no words in {name} match the filter ({word_filter}).")
+        sys.exit(-1)
+    return FilteredWordList(word_list, ids, key, mapped)
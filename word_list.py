@@ -1,9 +1,154 @@
+import mmap
+import os
+import struct
 import sys
+import threading
+
+# Compiled dictionary layout (native byte order, the cache is machine-local):
+#   header  : magic, version, source size, source mtime (ns), word count
+#   offsets : word count + 1 unsigned ints into the blob
+#   blob    : utf-8 words packed back to back, no separators
+_MAGIC = b"MKWL"
+_VERSION = 1
+_HEADER = struct.Struct("=4sIQQI")
+_CACHE_DIR = os.path.join("dicts", ".cache")
+
+
+def _source_path(name: str) -> str:
+    return os.path.join("dicts", name)
+
+
+def cache_path(name: str, suffix: str) -> str:
+    """Path of a file derived from dicts/<name> in the compiled cache."""
+    return os.path.join(_CACHE_DIR, f"{name}.{suffix}")
+
+
+def source_stamp(name: str):
+    """(size, mtime in ns) of dicts/<name>, used to detect stale caches."""
+    st = os.stat(_source_path(name))
+    return st.st_size, st.st_mtime_ns
+
+
+def write_cache(path: str, parts):
+    """Atomically write a cache file from a sequence of byte strings."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique per thread too: a loader thread and the next test's may build
+    # the same file at once
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            for part in parts:
+                f.write(part)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def map_cache(path: str) -> mmap.mmap:
+    """Memory-map a cache file read-only."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _compiled_path(name: str) -> str:
+    return cache_path(name, "wl")
+
+
+class CompiledWordList:
+    """
+    Read-only sequence over a compiled dictionary.
+
+    Supports len() and indexing, so random.choice() samples it in O(1)
+    without ever building a Python list of the words.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.source_size, self.source_mtime, self.count = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self._mm.close()
+            raise ValueError(f"{path}: not a compiled word list")
+        start = _HEADER.size
+        self._blob_start = start + 4 * (self.count + 1)
+        self._offsets = memoryview(self._mm)[start:self._blob_start].cast("I")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("word index out of range")
+        base = self._blob_start
+        return self._mm[base + self._offsets[index]:base + self._offsets[index + 1]].decode("utf-8")
+
+    def close(self):
+        self._offsets.release()
+        self._mm.close()
+
+
+def _is_stale(name: str) -> bool:
+    try:
+        stamp = source_stamp(name)
+        with open(_compiled_path(name), "rb") as f:
+            header = f.read(_HEADER.size)
+        magic, version, size, mtime, _ = _HEADER.unpack(header)
+    except (OSError, struct.error):
+        return True
+    return (magic, version, size, mtime) != (_MAGIC, _VERSION) + stamp
+
+
+def compile_word_list(name: str, force: bool = False) -> bool:
+    """
+    Rebuild dicts/.cache/<name>.wl from dicts/<name> if it is missing or stale.
+
+    Returns True if the compiled file was (re)written.
+    """
+    if not force and not _is_stale(name):
+        return False
+
+    src = _source_path(name)
+    st = os.stat(src)
+    with open(src, "rb") as f:
+        words = [w.strip() for w in f.read().split(b"\n")]
+    words = [w for w in words if w]
+
+    offsets = [0]
+    for w in words:
+        offsets.append(offsets[-1] + len(w))
+
+    write_cache(_compiled_path(name),
+                (_HEADER.pack(_MAGIC, _VERSION, st.st_size, st.st_mtime_ns, len(words)),
+                 struct.pack(f"={len(offsets)}I", *offsets), b"".join(words)))
+    return True
+
 
 def load_word_list(name:str):
     try:
-        with open(f"dicts/{name}","r") as f:
-            return f.read().strip().split("\n")
+        try:
+            compile_word_list(name)
+            return CompiledWordList(_compiled_path(name))
+        except OSError:
+            # read-only checkout or mount: fall back to the plain text list
+            with open(_source_path(name),"r") as f:
+                return f.read().strip().split("\n")
     except Exception as e:
         print(str(e))
         sys.exit(-1)
+
+
+if __name__ == "__main__":
+    # usage: python word_list.py [-f] [name ...]   (defaults to every list in dicts/)
+    args = sys.argv[1:]
+    force = "-f" in args
+    names = [a for a in args if a != "-f"] or sorted(
+        n for n in os.listdir("dicts") if os.path.isfile(_source_path(n)))
+    for n in names:
+        print(f"{n}: {'rebuilt' if compile_word_list(n, force) else 'up to date'}")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Lazily generated target text for Monkey-CLI's endless mode.
+Words are pulled from a generator only as the cursor approaches the end
+of what has been produced, and text far behind the cursor is dropped, so
+memory and per-frame cost stay constant however long the test runs.
+"""
+
+from typing import Iterator
+
+
+class WordStream:
+    """
+    Sliding window over an unbounded text, addressed by absolute position.
+
+    Supports len() (characters produced so far) and indexing/slicing with
+    absolute positions inside the window, like the str it replaces.
+    """
+
+    def __init__(self, words: Iterator[str], lookahead: int = 512, keep_behind: int = 256):
+        """
+        Initialize the stream.
+
+        Args:
+            words: Endless iterator of words
+            lookahead: Characters to keep generated ahead of the cursor
+            keep_behind: Characters to keep behind the cursor for display
+        """
+        self._words = words
+        self.lookahead = lookahead
+        self.keep_behind = keep_behind
+        self.base = 0  # absolute position of self._text[0]
+        self._text = ""
+        self.advance(0)
+
+    def __len__(self) -> int:
+        return self.base + len(self._text)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start = max(index.start or 0, self.base) - self.base
+            stop = (len(self) if index.stop is None else index.stop) - self.base
+            return self._text[start:max(start, stop)]
+        if not self.base <= index < len(self):
+            raise IndexError("position outside the stream window")
+        return self._text[index - self.base]
+
+    def advance(self, position: int):
+        """Make sure text exists `lookahead` characters past `position`
+        and forget text well behind it."""
+        if len(self) - position < self.lookahead:
+            parts = []
+            missing = self.lookahead * 2 - (len(self) - position)
+            while missing > 0:
+                word = next(self._words)
+                parts.append(word)
+                missing -= len(word) + 1
+            prefix = " " if self._text else ""
+            self._text += prefix + " ".join(parts)
+
+        # Trim in large steps so the copy is amortized over many keys
+        behind = position - self.base
+        if behind > 2 * self.keep_behind:
+            drop = behind - self.keep_behind
+            self._text = self._text[drop:]
+            self.base += drop